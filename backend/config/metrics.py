@@ -0,0 +1,90 @@
+import os
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker writes its
+# samples to files in that directory and /metrics sums them over all workers
+
+REQUESTS = Counter(
+    'finance_http_requests_total', 'HTTP requests by route, method and status',
+    ['route', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'finance_http_request_duration_seconds', 'Time spent handling the request',
+    ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'finance_http_request_db_queries', 'Database queries run by the request',
+    ['route', 'method'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_DB_DURATION = Histogram(
+    'finance_http_request_db_duration_seconds', 'Total SQL time of the request',
+    ['route', 'method'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_REQUESTS = Counter(
+    'finance_cache_requests_total', 'Cache lookups by cache and result (hit, miss or not_modified)',
+    ['cache', 'result'],
+)
+
+
+def route_name(request):
+    """DRF route and action (e.g. transaction-summary); the URL pattern for unnamed views; 'unmatched' for 404s."""
+    match = request.resolver_match
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route
+
+
+def observe_request(request, response, queries, db_seconds, seconds):
+    route, method = route_name(request), request.method
+    REQUESTS.labels(route, method, str(response.status_code)).inc()
+    REQUEST_LATENCY.labels(route, method).observe(seconds)
+    REQUEST_DB_QUERIES.labels(route, method).observe(queries)
+    REQUEST_DB_DURATION.labels(route, method).observe(db_seconds)
+
+
+class NotificationOutboxCollector:
+    """Notification outcomes read from the outbox at scrape time, so sends from any process are included."""
+
+    def collect(self):
+        from finance.models import NotificationOutbox
+
+        rows = NotificationOutbox.objects.values('status').annotate(count=Count('id')).order_by()
+        counts = {status: 0 for status, _ in NotificationOutbox.STATUS_CHOICES}
+        counts.update({row['status']: row['count'] for row in rows})
+
+        family = GaugeMetricFamily('finance_notification_outbox', 'Reminders in the outbox by status', labels=['status'])
+        for status, count in counts.items():
+            family.add_metric([status.lower()], count)
+        yield family
+
+
+class _ProcessCollector:
+    # The in-process registry when not running under multiple workers (runserver, tests)
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def registry():
+    scrape = CollectorRegistry()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        MultiProcessCollector(scrape)
+    else:
+        scrape.register(_ProcessCollector())
+    scrape.register(NotificationOutboxCollector())
+    return scrape
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,151 @@
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from .metrics import observe_request
+
+logger = logging.getLogger('request_metrics')
+
+# The current request's QueryMetrics; context variables follow the request into sync_to_async threads
+current_metrics = ContextVar('request_query_metrics', default=None)
+
+SLOWEST_SQL_LENGTH = 500
+
+
+class QueryMetrics:
+    """execute_wrapper that counts and times every statement run on a connection."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+        # Async views may run queries from several threads at once
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.total += elapsed
+                if elapsed >= self.slowest:
+                    self.slowest = elapsed
+                    self.slowest_sql = sql
+
+    def install(self, stack):
+        """Record queries of this thread's connections until `stack` is closed."""
+        for connection in connections.all():
+            if self not in connection.execute_wrappers:
+                stack.enter_context(connection.execute_wrapper(self))
+
+
+def run_tracked(func, *args):
+    """
+    Call func in a worker thread with the current request's query metrics
+    on that thread's connections (they are per thread, so the request's
+    wrappers do not see them otherwise).
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return func(*args)
+    with ExitStack() as stack:
+        metrics.install(stack)
+        return func(*args)
+
+
+class RequestMetricsMiddleware:
+    """
+    Per request: number of queries, total SQL time, slowest statement and
+    total time. Sent as a Server-Timing header, recorded in the Prometheus
+    histograms of config.metrics and logged as JSON on the `request_metrics`
+    logger when over the REQUEST_METRICS_* thresholds.
+
+    Uses connection.execute_wrapper, so unlike connection.queries it works
+    with DEBUG=False. Queries run while a streaming response is consumed
+    happen after this returns and are not counted. Works under WSGI and ASGI;
+    code that queries from its own threads wraps the work in run_tracked.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = QueryMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                metrics.install(stack)
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = QueryMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Sync views and the async ORM query from the request's thread-sensitive thread
+            await sync_to_async(metrics.install)(stack)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, elapsed):
+        observe_request(request, response, metrics.count, metrics.total, elapsed)
+        if getattr(settings, 'REQUEST_METRICS_HEADER', True):
+            response['Server-Timing'] = server_timing(metrics, elapsed)
+        if self.is_slow(metrics, elapsed):
+            logger.warning(json.dumps(self.record(request, response, metrics, elapsed)))
+        return response
+
+    def is_slow(self, metrics, elapsed):
+        return (
+            elapsed * 1000 >= getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500)
+            or metrics.count >= getattr(settings, 'REQUEST_METRICS_MAX_QUERIES', 50)
+            or metrics.slowest * 1000 >= getattr(settings, 'REQUEST_METRICS_SLOW_QUERY_MS', 100)
+        )
+
+    def record(self, request, response, metrics, elapsed):
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        return {
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': metrics.count,
+            'db_ms': round(metrics.total * 1000, 2),
+            'slowest_query_ms': round(metrics.slowest * 1000, 2),
+            'slowest_query': (metrics.slowest_sql or '')[:SLOWEST_SQL_LENGTH] or None,
+        }
+
+
+def server_timing(metrics, elapsed):
+    return ', '.join([
+        f'db;desc="{metrics.count} queries";dur={metrics.total * 1000:.2f}',
+        f'db-slowest;dur={metrics.slowest * 1000:.2f}',
+        f'total;dur={elapsed * 1000:.2f}',
+    ])
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica'
+STICKY_KEY = 'db:primary-reads:{user_id}'
+
+# Alias for the reads of the current block; context variables follow the
+# request into sync_to_async threads (the async summary's fan-out included)
+_read_alias = ContextVar('read_db_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES and getattr(settings, 'REPLICA_READS', True)
+
+
+def stick_to_primary(user_id):
+    """Keep the user's reads on the primary until the replica has caught up with a write."""
+    if replica_configured():
+        cache.set(STICKY_KEY.format(user_id=user_id), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+
+
+def read_alias_for(user_id):
+    if not replica_configured() or cache.get(STICKY_KEY.format(user_id=user_id)):
+        return DEFAULT_DB_ALIAS
+    return REPLICA_DB_ALIAS
+
+
+@contextmanager
+def read_from_replica(user_id):
+    """
+    Route the reads of this block to the replica, unless none is configured
+    or the user wrote within the last REPLICA_STICKY_SECONDS. Yields the alias.
+    """
+    alias = read_alias_for(user_id)
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes, and reads outside read_from_replica, go to the primary. The
+    replica is populated by replication, never migrated from here.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'config.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -94,6 +97,55 @@ DATABASES = {
     }
 }
 
+# Local SQLite database, e.g. to run the test suite without a PostgreSQL server:
+#   DB_ENGINE=sqlite python manage.py test finance users
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# Optional read replica for the reporting endpoints (see config/routers.py). Unset
+# fields fall back to the primary's, e.g. DB_REPLICA_HOST=replica.internal, or two
+# local databases: DB_REPLICA_NAME=money_management_replica (a file path with sqlite).
+# Tests mirror it onto the primary's test database.
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        **{
+            key: os.environ[f'DB_REPLICA_{key}']
+            for key in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')
+            if os.environ.get(f'DB_REPLICA_{key}')
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['config.routers.PrimaryReplicaRouter']
+
+# Set to False to send every read back to the primary, e.g. while the replica lags
+REPLICA_READS = os.environ.get('REPLICA_READS', 'True') == 'True'
+
+# Seconds a user's reads stay on the primary after one of their writes; keep it
+# above the replica's usual lag
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS') or 10)
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# File based by default so every gunicorn worker shares it; MAX_ENTRIES bounds its size.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND') or 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION') or '/tmp/finance_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES') or 5000),
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -143,11 +195,45 @@ else:
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     )
 }
 
+# Days a soft deleted transaction stays in finance_transaction before compact_deleted_transactions archives it
+DELETED_TRANSACTION_RETENTION_DAYS = int(os.environ.get('DELETED_TRANSACTION_RETENTION_DAYS') or 90)
+
+# Seconds CachedJWTAuthentication keeps a token's user before reading it again
+JWT_USER_CACHE_TIMEOUT = int(os.environ.get('JWT_USER_CACHE_TIMEOUT') or 300)
+
+# Keyset pagination of the transactions list (opt-in with ?page_size= or ?cursor=)
+TRANSACTIONS_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_PAGE_SIZE') or 50)
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_MAX_PAGE_SIZE') or 500)
+
+# Threads (each with its own persistent DB connection) the async summary fans its queries out to, per process
+SUMMARY_FANOUT_THREADS = int(os.environ.get('SUMMARY_FANOUT_THREADS') or 8)
+
+# Per-request query/timing metrics (config.middleware): Server-Timing header, and a JSON
+# log line on the request_metrics logger when any threshold is reached (0 logs everything)
+REQUEST_METRICS_HEADER = os.environ.get('REQUEST_METRICS_HEADER', 'True') == 'True'
+REQUEST_METRICS_SLOW_MS = float(os.environ.get('REQUEST_METRICS_SLOW_MS') or 500)
+REQUEST_METRICS_MAX_QUERIES = int(os.environ.get('REQUEST_METRICS_MAX_QUERIES') or 50)
+REQUEST_METRICS_SLOW_QUERY_MS = float(os.environ.get('REQUEST_METRICS_SLOW_QUERY_MS') or 100)
+
+# Optional bearer token required to scrape /metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'request_metrics': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
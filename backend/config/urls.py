@@ -19,7 +19,8 @@ from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from users.views import RegisterView, UserProfileView, WhatsAppTestView
 from rest_framework.routers import DefaultRouter
-from finance.views import CategoryViewSet, TransactionViewSet, SavingsGoalViewSet, DebtViewSet, AccountViewSet, RecurringExpenseViewSet
+from config.metrics import metrics_view
+from finance.views import CategoryViewSet, TransactionViewSet, SavingsGoalViewSet, DebtViewSet, AccountViewSet, RecurringExpenseViewSet, summary_async
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
@@ -31,6 +32,9 @@ router.register(r'recurring', RecurringExpenseViewSet, basename='recurring')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+
+    # Prometheus scrape endpoint (not routed by Traefik; scraped inside the network)
+    path('metrics', metrics_view, name='metrics'),
     
     # Auth Endpoints
     path('api/auth/register/', RegisterView.as_view(), name='auth_register'),
@@ -42,5 +46,6 @@ urlpatterns = [
     path('api/users/whatsapp-test/', WhatsAppTestView.as_view(), name='whatsapp_test'),
     
     # Finance Endpoints
+    path('api/finance/transactions/summary/async/', summary_async, name='transaction-summary-async'),
     path('api/finance/', include(router.urls)),
 ]
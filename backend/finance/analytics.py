@@ -0,0 +1,178 @@
+import datetime
+from django.db.models import Case, DateField, F, Func, Q, Sum, Value, When, Window
+from django.db.models.functions import Cast, TruncDay, TruncWeek, TruncMonth, TruncYear
+from .models import Transaction, Account, Debt, SavingsGoal
+
+TRUNCATIONS = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+DEFAULT_GRANULARITY = 'day'
+DEFAULT_DAYS = 30
+# Ten years of days; longer ranges need a coarser granularity
+MAX_BUCKETS = 3660
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket `day` falls in; weeks start on Monday like TruncWeek."""
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    if granularity == 'week':
+        return start + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return (start + datetime.timedelta(days=32)).replace(day=1)
+    if granularity == 'year':
+        return start.replace(year=start.year + 1)
+    return start + datetime.timedelta(days=1)
+
+
+def bucket_count(start, end, granularity):
+    """Number of buckets overlapping [start, end], without building them."""
+    if granularity == 'week':
+        return (bucket_start(end, 'week') - bucket_start(start, 'week')).days // 7 + 1
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    if granularity == 'year':
+        return end.year - start.year + 1
+    return (end - start).days + 1
+
+
+def buckets(start, end, granularity):
+    """Start dates of every bucket overlapping [start, end]."""
+    current = bucket_start(start, granularity)
+    found = []
+    while current <= end:
+        found.append(current)
+        current = next_bucket(current, granularity)
+    return found
+
+
+def parse_range(params, today=None):
+    """
+    (start, end, granularity) from the start/end/granularity query
+    parameters; by default the last DEFAULT_DAYS days by day. Raises
+    ValueError with a message for the client.
+    """
+    granularity = params.get('granularity', DEFAULT_GRANULARITY)
+    if granularity not in TRUNCATIONS:
+        raise ValueError(f'granularity must be one of {", ".join(TRUNCATIONS)}')
+    try:
+        end = datetime.date.fromisoformat(params['end']) if params.get('end') else today or datetime.date.today()
+        start = (datetime.date.fromisoformat(params['start']) if params.get('start')
+                 else end - datetime.timedelta(days=DEFAULT_DAYS - 1))
+    except ValueError:
+        raise ValueError('start and end must be dates (YYYY-MM-DD)')
+    if start > end:
+        raise ValueError('start must not be after end')
+    if bucket_count(start, end, granularity) > MAX_BUCKETS:
+        raise ValueError(f'At most {MAX_BUCKETS} buckets; use a coarser granularity')
+    return start, end, granularity
+
+
+def _category_rows(rows):
+    return [
+        {'category__name': row['category__name'], 'category__color': row['category__color'], 'total': row['total']}
+        for row in rows
+    ]
+
+
+def time_series(user, start, end, granularity=DEFAULT_GRANULARITY, by_category=False):
+    """
+    Income and expense totals per bucket between `start` and `end`
+    (inclusive), transfers excluded, from a single GROUP BY over the
+    truncated date. Buckets without transactions are filled with zeros.
+    """
+    fields = ['period', 'type'] + (['category__name', 'category__color'] if by_category else [])
+    rows = (
+        Transaction.objects.filter(user=user, is_transfer=False, date__gte=start, date__lte=end)
+        .annotate(period=TRUNCATIONS[granularity]('date'))
+        .values(*fields)
+        .annotate(total=Sum('amount'))
+        .order_by('period', '-total')
+    )
+    grouped = {}
+    for row in rows:
+        grouped.setdefault((row['period'], row['type']), []).append(row)
+
+    series = []
+    for period in buckets(start, end, granularity):
+        incomes, expenses = grouped.get((period, 'IN'), []), grouped.get((period, 'OUT'), [])
+        income = sum((row['total'] for row in incomes), 0)
+        expense = sum((row['total'] for row in expenses), 0)
+        bucket = {'period': period.strftime('%Y-%m-%d'), 'income': income, 'expense': expense, 'net': income - expense}
+        if by_category:
+            bucket['incomes_by_category'] = _category_rows(incomes)
+            bucket['expenses_by_category'] = _category_rows(expenses)
+        series.append(bucket)
+    return series
+
+
+class _RunningSum(Func):
+    # SUM(SUM(...)) OVER (...): Django refuses Sum() over an aggregate
+    function = 'SUM'
+    window_compatible = True
+
+
+def balance_history(user, start, end, granularity=DEFAULT_GRANULARITY):
+    """
+    Closing balance of every account at the end of each bucket between
+    `start` and `end`, plus the net worth: the accounts' total, the savings
+    goals and the outstanding debts. Goals and debts keep no history, so
+    their current amounts apply to every bucket.
+
+    Transactions are grouped by account and bucket, with everything before
+    the first bucket folded into one opening row, and a running SUM window turns the
+    groups into cumulative balances on top of Account.balance: one query
+    however long the history is.
+    """
+    periods = buckets(start, end, granularity)
+    # The first bucket is whole, so the opening row is the day before it
+    before = periods[0] - datetime.timedelta(days=1)
+    signed = Case(When(type='IN', then=F('amount')), default=-F('amount'))
+    # Inside a CASE the Trunc no longer converts PostgreSQL's timestamp back to a date, so cast it
+    bucket = Cast(TRUNCATIONS[granularity]('date'), DateField())
+    period = Case(When(date__lt=periods[0], then=Value(before)), default=bucket, output_field=DateField())
+    rows = (
+        Transaction.objects.filter(user=user, account__isnull=False, date__lte=end)
+        .values('account_id', period=period)
+        # A plain aggregate is what makes Django GROUP BY; the window alone would not
+        .annotate(net=Sum(signed))
+        .annotate(running=Window(_RunningSum(Sum(signed)), partition_by=F('account_id'), order_by=F('period').asc()))
+        .order_by('account_id', 'period')
+    )
+    running = {}
+    for row in rows:
+        running.setdefault(row['account_id'], {})[row['period']] = row['running']
+
+    accounts, total = [], [0] * len(periods)
+    for account in Account.objects.filter(user=user).order_by('id'):
+        cumulative = running.get(account.id, {})
+        balance = account.balance + cumulative.get(before, 0)
+        balances = []
+        for i, period in enumerate(periods):
+            # Buckets without transactions carry the previous closing balance
+            balance = account.balance + cumulative[period] if period in cumulative else balance
+            balances.append(balance)
+            total[i] += balance
+        accounts.append({'id': account.id, 'name': account.name, 'color': account.color, 'balances': balances})
+
+    savings = SavingsGoal.objects.filter(user=user).aggregate(total=Sum('current_amount'))['total'] or 0
+    debts = Debt.objects.filter(user=user, is_settled=False).aggregate(
+        owed=Sum('remaining_amount', filter=Q(type='I_OWE')),
+        receivable=Sum('remaining_amount', filter=Q(type='OWED_TO_ME')),
+    )
+    owed, receivable = debts['owed'] or 0, debts['receivable'] or 0
+    return {
+        'periods': [period.strftime('%Y-%m-%d') for period in periods],
+        'accounts': accounts,
+        'total': total,
+        'savings': savings,
+        'debts_owed': owed,
+        'debts_receivable': receivable,
+        'net_worth': [balance + savings + receivable - owed for balance in total],
+    }
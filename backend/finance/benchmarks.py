@@ -0,0 +1,273 @@
+import datetime
+import platform
+import random
+import statistics
+import subprocess
+import time
+from decimal import Decimal
+from io import StringIO
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Category, Transaction, Account, RecurringExpense, SavingsGoal, Debt
+from .bulk import bulk_create_transactions
+from .recurring import next_due_date
+
+User = get_user_model()
+
+BULK_BATCH_SIZE = 1000
+DEFAULT_SIZES = (1000, 10000, 50000)
+
+OUT_CATEGORIES = ['Comida', 'Transporte', 'Renta', 'Servicios', 'Salud', 'Ocio', 'Ropa', 'Educación', 'Mascotas', 'Regalos']
+IN_CATEGORIES = ['Sueldo', 'Freelance', 'Intereses', 'Reembolsos']
+DESCRIPTIONS = ['Uber', 'Súper', 'Renta', 'Farmacia', 'Gasolina', 'Netflix', 'Cine', 'Café', 'Nómina', None]
+COLORS = ['#97A97C', '#E07A5F', '#3D405B', '#81B29A', '#F2CC8F', '#6D597A']
+
+
+def seed(users=1, accounts=4, categories=10, recurring=6, goals=3, debts=3, transactions=1000, years=3,
+         seed=42, prefix='bench', today=None, whatsapp=False):
+    """
+    Deterministic synthetic dataset: the same arguments always produce the
+    same rows (relative to `today`). Everything is bulk inserted; transactions
+    go through bulk_create_transactions so the ledgers and rollups match.
+    WhatsApp reminders stay off unless `whatsapp` is set, since a committed
+    dataset would otherwise get real reminders queued and sent.
+    Returns the created users.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    days = max(1, years * 365)
+
+    contact = {'whatsapp_enabled': True, 'whatsapp_phone': '+5215500000000', 'whatsapp_apikey': 'bench'} if whatsapp else {}
+    created_users = User.objects.bulk_create([
+        User(username=f'{prefix}-{seed}-{i}', password=make_password(None), **contact)
+        for i in range(users)
+    ])
+    # Not every backend returns primary keys from bulk_create
+    created_users = list(User.objects.filter(username__in=[u.username for u in created_users]).order_by('username'))
+
+    out_names = [OUT_CATEGORIES[i % len(OUT_CATEGORIES)] + (f' {i}' if i >= len(OUT_CATEGORIES) else '') for i in range(categories)]
+    in_names = IN_CATEGORIES[:max(1, categories // 3)]
+    Category.objects.bulk_create([
+        Category(user=user, name=name, type=type, color=rng.choice(COLORS))
+        for user in created_users
+        for type, names in (('OUT', out_names), ('IN', in_names))
+        for name in names
+    ], batch_size=BULK_BATCH_SIZE)
+    Account.objects.bulk_create([
+        Account(user=user, name=f'Cuenta {i + 1}', type=rng.choice(Account.TYPE_CHOICES)[0],
+                balance=Decimal(rng.randint(0, 2000000)) / 100, color=rng.choice(COLORS))
+        for user in created_users
+        for i in range(accounts)
+    ], batch_size=BULK_BATCH_SIZE)
+
+    category_ids, account_ids = {}, {}
+    for row in Category.objects.filter(user__in=created_users).values('user_id', 'type', 'id').order_by('id'):
+        category_ids.setdefault((row['user_id'], row['type']), []).append(row['id'])
+    for row in Account.objects.filter(user__in=created_users).values('user_id', 'id').order_by('id'):
+        account_ids.setdefault(row['user_id'], []).append(row['id'])
+
+    expenses = []
+    for user in created_users:
+        for i in range(recurring):
+            due_day = rng.randint(1, 31)
+            paid = rng.random() < 0.5
+            last_paid_date = today.replace(day=1) if paid else None
+            expenses.append(RecurringExpense(
+                user=user, name=f'Fijo {i + 1}', amount=Decimal(rng.randint(10000, 1500000)) / 100,
+                category_id=rng.choice(category_ids[(user.id, 'OUT')]), account_id=rng.choice(account_ids[user.id]),
+                due_day=due_day, last_paid_date=last_paid_date,
+                # bulk_create skips the pre_save signal that normally schedules it
+                next_due_date=next_due_date(due_day, last_paid_date, today),
+            ))
+    RecurringExpense.objects.bulk_create(expenses, batch_size=BULK_BATCH_SIZE)
+
+    SavingsGoal.objects.bulk_create([
+        SavingsGoal(user=user, name=f'Meta {i + 1}', target_amount=Decimal(rng.randint(1000, 100000)),
+                    current_amount=Decimal(rng.randint(0, 1000)),
+                    target_date=today + datetime.timedelta(days=rng.randint(30, 730)), color=rng.choice(COLORS))
+        for user in created_users
+        for i in range(goals)
+    ], batch_size=BULK_BATCH_SIZE)
+    debt_rows = []
+    for user in created_users:
+        for i in range(debts):
+            total = Decimal(rng.randint(500, 50000))
+            debt_rows.append(Debt(user=user, name=f'Deuda {i + 1}', type=rng.choice(Debt.TYPE_CHOICES)[0],
+                                  total_amount=total, remaining_amount=total * Decimal(rng.randint(0, 100)) / 100,
+                                  due_date=today + datetime.timedelta(days=rng.randint(-60, 365))))
+    Debt.objects.bulk_create(debt_rows, batch_size=BULK_BATCH_SIZE)
+
+    for user in created_users:
+        batch = []
+        for _ in range(transactions):
+            type = 'IN' if rng.random() < 0.2 else 'OUT'
+            tx = Transaction(
+                user=user,
+                account_id=rng.choice(account_ids[user.id] + [None]),
+                category_id=rng.choice(category_ids[(user.id, type)] + [None]),
+                type=type,
+                amount=Decimal(rng.randint(100, 500000 if type == 'IN' else 150000)) / 100,
+                date=today - datetime.timedelta(days=rng.randrange(days)),
+                description=rng.choice(DESCRIPTIONS),
+                payment_method=rng.choice(['CASH', 'CARD', 'TRANSFER']),
+                is_deleted=rng.random() < 0.02,
+            )
+            if tx.is_deleted:
+                # Deleted on the day they happened, so old ones are due for compaction
+                tx.deleted_at = timezone.make_aware(datetime.datetime.combine(tx.date, datetime.time()))
+            batch.append(tx)
+            if len(batch) >= BULK_BATCH_SIZE:
+                bulk_create_transactions(batch, batch_size=BULK_BATCH_SIZE)
+                batch = []
+        bulk_create_transactions(batch, batch_size=BULK_BATCH_SIZE)
+
+    return created_users
+
+
+class ScenarioContext:
+    """The benchmarked user with an authenticated API client (real JWT, so authentication is measured too)."""
+
+    def __init__(self, user):
+        self.user = user
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        self.accounts = list(Account.objects.filter(user=user).order_by('id').values_list('id', flat=True))
+        self.calls = 0
+
+
+def _transfer(ctx):
+    return ctx.client.post('/api/finance/transactions/transfer/', {
+        'from_account': ctx.accounts[0], 'to_account': ctx.accounts[1], 'amount': '10.00',
+    }).status_code
+
+
+def _reconcile(ctx):
+    # A different target every call so each one writes an adjustment
+    ctx.calls += 1
+    return ctx.client.post(f'/api/finance/accounts/{ctx.accounts[0]}/reconcile/', {
+        'actual_balance': str(1000 + ctx.calls),
+    }).status_code
+
+
+def _analytics(ctx):
+    # A year of daily buckets with the category breakdown
+    start = datetime.date.today() - datetime.timedelta(days=364)
+    return ctx.client.get('/api/finance/transactions/analytics/', {'start': start.isoformat(), 'by_category': 'true'}).status_code
+
+
+def _net_worth(ctx):
+    # A year of daily closing balances
+    start = datetime.date.today() - datetime.timedelta(days=364)
+    return ctx.client.get('/api/finance/accounts/net-worth/', {'start': start.isoformat()}).status_code
+
+
+def _notifications(ctx):
+    call_command('send_whatsapp_notifications', '--scan-only', stdout=StringIO())
+    return 'OK'
+
+
+SCENARIOS = {
+    'summary': lambda ctx: ctx.client.get('/api/finance/transactions/summary/').status_code,
+    'transactions_page': lambda ctx: ctx.client.get('/api/finance/transactions/', {'page_size': 50}).status_code,
+    'transactions_list': lambda ctx: ctx.client.get('/api/finance/transactions/').status_code,
+    'analytics': _analytics,
+    'net_worth': _net_worth,
+    'forecast': lambda ctx: ctx.client.get('/api/finance/accounts/forecast/', {'days': 365}).status_code,
+    'transfer': _transfer,
+    'reconcile': _reconcile,
+    'notifications_scan': _notifications,
+}
+
+
+def measure(func, ctx, repeat):
+    timings, queries, status = [], [], None
+    for _ in range(repeat):
+        # Every run starts cold: the summary cache would otherwise answer all but the first
+        cache.clear()
+        executed = []
+        with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+            start = time.perf_counter()
+            status = func(ctx)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(executed))
+    return {
+        'best_ms': round(min(timings) * 1000, 2),
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'queries': max(queries),
+        'status': status,
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, repeat=5, users=3, seed_value=42, scenarios=None, today=None):
+    """
+    Seed each dataset size (transactions per user) inside a transaction that
+    is rolled back, and time every scenario against it.
+    """
+    names = scenarios or list(SCENARIOS)
+    results = {}
+    # Local memory cache so the benchmark never touches (or clears) the real one
+    with override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ALLOWED_HOSTS=['testserver'],
+    ):
+        for size in sizes:
+            with transaction.atomic():
+                start = time.perf_counter()
+                # Rolled back below, so the notification scan can have reminders to queue
+                seeded = seed(users=users, transactions=size, seed=seed_value, prefix=f'bench-run-{time.time_ns()}',
+                              today=today, whatsapp=True)
+                seed_s = time.perf_counter() - start
+
+                ctx = ScenarioContext(seeded[0])
+                results[str(size)] = {
+                    'seed_s': round(seed_s, 2),
+                    'scenarios': {name: measure(SCENARIOS[name], ctx, repeat) for name in names},
+                }
+                transaction.set_rollback(True)
+
+    return {'meta': environment(repeat=repeat, users=users, seed=seed_value), 'results': results}
+
+
+def environment(**options):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        **options,
+    }
+
+
+def compare(baseline, report):
+    """Per size and scenario: time ratio and query delta of `report` against `baseline`."""
+    changes = {}
+    for size, current in report['results'].items():
+        previous = baseline.get('results', {}).get(size)
+        if not previous:
+            continue
+        for name, result in current['scenarios'].items():
+            before = previous['scenarios'].get(name)
+            if not before:
+                continue
+            changes.setdefault(size, {})[name] = {
+                'time_ratio': round(result['median_ms'] / max(before['median_ms'], 0.01), 2),
+                'query_delta': result['queries'] - before['queries'],
+            }
+    return changes
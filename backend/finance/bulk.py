@@ -0,0 +1,27 @@
+from functools import partial
+from django.db import transaction
+from .models import Transaction
+from .caching import record_write
+from . import ledger, rollups, snapshots
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def bulk_create_transactions(transactions, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    bulk_create() skips the save signals, so this applies the account ledger,
+    monthly rollup, balance snapshot and data version updates for the whole batch itself.
+    """
+    if not transactions:
+        return []
+
+    with transaction.atomic():
+        created = Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+        changes = [(tx.tracked_state(), 1) for tx in created]
+        ledger.apply_states(changes)
+        rollups.apply_states(changes)
+        snapshots.apply_states(changes)
+
+    for user_id in {tx.user_id for tx in created}:
+        transaction.on_commit(partial(record_write, user_id))
+    return created
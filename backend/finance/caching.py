@@ -0,0 +1,77 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from config.metrics import CACHE_REQUESTS
+from config.routers import REPLICA_DB_ALIAS, stick_to_primary
+
+VERSION_KEY = 'finance:data-version:{user_id}'
+SUMMARY_KEY = 'finance:summary:{user_id}:{version}:{month}:{year}:{today}'
+SUMMARY_TIMEOUT = 60 * 60 * 24
+
+
+def get_data_version(user_id):
+    version = cache.get(VERSION_KEY.format(user_id=user_id))
+    if version is None:
+        # Evicted or never written: start a fresh version so no stale entry can match
+        version = bump_data_version(user_id)
+    return version
+
+
+async def aget_data_version(user_id):
+    version = await cache.aget(VERSION_KEY.format(user_id=user_id))
+    if version is None:
+        version = time.time_ns()
+        await cache.aset(VERSION_KEY.format(user_id=user_id), version, None)
+    return version
+
+
+def bump_data_version(user_id):
+    # A timestamp rather than an increment: no read-modify-write race between workers,
+    # and a version lost to eviction is never reissued
+    version = time.time_ns()
+    cache.set(VERSION_KEY.format(user_id=user_id), version, None)
+    return version
+
+
+def record_write(user_id):
+    """After a commit that changed the user's data: new cache version, and reads back on the primary."""
+    bump_data_version(user_id)
+    stick_to_primary(user_id)
+
+
+def summary_cache_key(user_id, version, month, year, today):
+    return SUMMARY_KEY.format(user_id=user_id, version=version, month=month or '', year=year or '', today=today.isoformat())
+
+
+def summary_etag(cache_key):
+    return '"%s"' % hashlib.sha1(cache_key.encode()).hexdigest()
+
+
+def build_timeout(read_alias):
+    # Stickiness only covers REPLICA_STICKY_SECONDS: a replica lagging longer can build
+    # from data older than the version the entry is keyed under, so such an entry must
+    # not outlive that window
+    if read_alias == REPLICA_DB_ALIAS:
+        return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    return SUMMARY_TIMEOUT
+
+
+def get_or_build(cache_key, build, name='summary', read_alias=None):
+    """Cached value of `build()`; `read_alias` is the database the build reads from."""
+    data = cache.get(cache_key)
+    CACHE_REQUESTS.labels(name, 'miss' if data is None else 'hit').inc()
+    if data is None:
+        data = build()
+        cache.set(cache_key, data, build_timeout(read_alias))
+    return data
+
+
+async def aget_or_build(cache_key, build, name='summary', read_alias=None):
+    """get_or_build for async views: `build` is a coroutine function."""
+    data = await cache.aget(cache_key)
+    CACHE_REQUESTS.labels(name, 'miss' if data is None else 'hit').inc()
+    if data is None:
+        data = await build()
+        await cache.aset(cache_key, data, build_timeout(read_alias))
+    return data
@@ -0,0 +1,37 @@
+import time
+from django.db import connection, transaction
+from .models import Transaction, ArchivedTransaction
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def compact_deleted(before, batch_size=DEFAULT_BATCH_SIZE, pause=0):
+    """
+    Move transactions soft deleted before `before` into ArchivedTransaction,
+    oldest first. Each batch is its own short transaction holding row locks
+    only, and rows a request has locked are skipped until the next run.
+    Returns the number of rows moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Transaction.all_objects.select_for_update(skip_locked=True)
+                .filter(is_deleted=True, deleted_at__lt=before)
+                .order_by('deleted_at', 'id')[:batch_size]
+            )
+            if not batch:
+                return moved
+            ArchivedTransaction.objects.bulk_create(
+                [ArchivedTransaction.from_transaction(tx) for tx in batch], ignore_conflicts=True,
+            )
+            # Deleted rows count in no ledger or rollup, so there is nothing for the delete signals to sync
+            ids = [tx.pk for tx in batch]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {Transaction._meta.db_table} WHERE id IN ({", ".join(["%s"] * len(ids))})', ids,
+                )
+        moved += len(batch)
+        if pause:
+            # Room for other writers (and replicas) between batches
+            time.sleep(pause)
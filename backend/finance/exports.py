@@ -0,0 +1,59 @@
+import csv
+import json
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'date'),
+    ('type', 'type'),
+    ('amount', 'amount'),
+    ('category', 'category__name'),
+    ('account', 'account__name'),
+    ('subcategory', 'subcategory'),
+    ('description', 'description'),
+    ('payment_method', 'payment_method'),
+    ('is_transfer', 'is_transfer'),
+    ('created_at', 'created_at'),
+)
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object that hands each written line back to the caller."""
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset):
+    # values_list + iterator: tuples straight from a server-side cursor, names joined in the same query
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _plain(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_plain(value) for value in row])
+
+
+def iter_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, map(_plain, row))), ensure_ascii=False) + '\n'
+
+
+def stream_export(queryset, output):
+    rows = export_rows(queryset)
+    return iter_csv(rows) if output == 'csv' else iter_ndjson(rows)
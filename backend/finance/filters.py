@@ -0,0 +1,147 @@
+import calendar
+import datetime
+from decimal import Decimal, InvalidOperation
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from .models import Transaction
+
+
+def _date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be a date in YYYY-MM-DD format.'})
+
+
+def _int(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
+
+
+def _decimal(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Must be a number.'})
+
+
+def _choice(params, name, choices):
+    value = params.get(name)
+    if not value:
+        return None
+    value = value.upper()
+    if value not in dict(choices):
+        raise ValidationError({name: f'Must be one of {", ".join(dict(choices))}.'})
+    return value
+
+
+def month_range(year, month):
+    """First and last day of a month, so month filters compare the raw date column."""
+    try:
+        last_day = calendar.monthrange(year, month)[1]
+        return datetime.date(year, month, 1), datetime.date(year, month, last_day)
+    except (ValueError, calendar.IllegalMonthError):
+        raise ValidationError({'month': 'Invalid month/year.'})
+
+
+class TransactionFilterBackend(BaseFilterBackend):
+    """
+    Query parameters for the transactions list and export. Every filter is a
+    plain comparison on a column (dates as ranges, never EXTRACT) so the
+    partial (user, ..., date) indexes can serve it:
+
+    date_from, date_to, month + year, category, account, type,
+    payment_method, is_transfer, amount_min, amount_max
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {}
+
+        month, year = _int(params, 'month'), _int(params, 'year')
+        if month and year:
+            filters['date__gte'], filters['date__lte'] = month_range(year, month)
+
+        date_from, date_to = _date(params, 'date_from'), _date(params, 'date_to')
+        if date_from:
+            filters['date__gte'] = max(date_from, filters.get('date__gte', date_from))
+        if date_to:
+            filters['date__lte'] = min(date_to, filters.get('date__lte', date_to))
+
+        category = params.get('category')
+        if category == 'none':
+            filters['category__isnull'] = True
+        elif category:
+            filters['category_id'] = _int(params, 'category')
+
+        account = params.get('account')
+        if account == 'none':
+            filters['account__isnull'] = True
+        elif account:
+            filters['account_id'] = _int(params, 'account')
+
+        tx_type = _choice(params, 'type', Transaction.TYPE_CHOICES)
+        if tx_type:
+            filters['type'] = tx_type
+
+        payment_method = _choice(params, 'payment_method', Transaction.METHOD_CHOICES)
+        if payment_method:
+            filters['payment_method'] = payment_method
+
+        is_transfer = params.get('is_transfer')
+        if is_transfer:
+            if is_transfer.lower() not in ('true', 'false', '1', '0'):
+                raise ValidationError({'is_transfer': 'Must be true or false.'})
+            filters['is_transfer'] = is_transfer.lower() in ('true', '1')
+
+        amount_min, amount_max = _decimal(params, 'amount_min'), _decimal(params, 'amount_max')
+        if amount_min is not None:
+            filters['amount__gte'] = amount_min
+        if amount_max is not None:
+            filters['amount__lte'] = amount_max
+
+        return queryset.filter(**filters)
+
+
+class TransactionSearchFilter(BaseFilterBackend):
+    """
+    ?search= over description and subcategory. On PostgreSQL this is a
+    pg_trgm word-similarity match served by the GIN trigram indexes and ranked
+    by similarity; elsewhere (SQLite tests) it falls back to icontains.
+    """
+    search_param = 'search'
+
+    def get_search_term(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        term = self.get_search_term(request)
+        if not term:
+            return queryset
+
+        if connection.vendor != 'postgresql':
+            return queryset.filter(Q(description__icontains=term) | Q(subcategory__icontains=term))
+
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        return (
+            queryset.filter(Q(description__trigram_word_similar=term) | Q(subcategory__trigram_word_similar=term))
+            .annotate(search_rank=Greatest(
+                TrigramWordSimilarity(term, 'description'),
+                TrigramWordSimilarity(term, 'subcategory'),
+            ))
+            .order_by('-search_rank', '-date', '-created_at', '-id')
+        )
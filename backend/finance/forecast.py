@@ -0,0 +1,151 @@
+import datetime
+import numpy as np
+from django.db.models import Min, Sum
+from .models import Account, Debt, RecurringExpense, Transaction
+from .recurring import PAYMENT_DESCRIPTION_PREFIX, next_due_date
+
+DEFAULT_DAYS = 90
+MAX_DAYS = 365
+# Window the average daily spend is taken over
+HISTORY_DAYS = 90
+
+EPOCH_YEAR = 1970
+
+
+def _months(dates):
+    # Months since 1970-01 for numpy's datetime64[M]
+    return np.array([(d.year - EPOCH_YEAR) * 12 + d.month - 1 for d in dates], dtype=np.int64)
+
+
+def _day_index(dates, start):
+    return (dates - np.datetime64(start, 'D')).astype(np.int64)
+
+
+def discretionary_rates(user, today, history_days=HISTORY_DAYS):
+    """
+    Average daily spend per (account, category) over the last `history_days`,
+    or since the user's first transaction if the history is shorter. Transfers,
+    recurring expense payments and debt payments are left out: the projection
+    schedules those.
+    """
+    since = today - datetime.timedelta(days=history_days - 1)
+    rows = list(
+        Transaction.objects.filter(user=user, type='OUT', is_transfer=False, date__gte=since, date__lte=today)
+        .exclude(description__startswith=PAYMENT_DESCRIPTION_PREFIX)
+        .exclude(description__startswith=Debt.PAYMENT_DESCRIPTION_PREFIX)
+        .values('account_id', 'category__name', 'category__color')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    if not rows:
+        return []
+    # A quiet stretch before the first expense in the window still counts as days without spend
+    first = Transaction.objects.filter(user=user, date__lte=today).aggregate(first=Min('date'))['first']
+    days = min(history_days, (today - first).days + 1)
+    return [{**row, 'daily_average': float(row['total']) / days} for row in rows]
+
+
+def _recurring_outflows(expenses, today, start, days, rows_by_account, unassigned):
+    """(row, day index, amount) of every occurrence in the horizon, all expenses at once."""
+    if not expenses:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    first_due = [expense.next_due_date or next_due_date(expense.due_day, expense.last_paid_date, today) for expense in expenses]
+    # One column per month the horizon can reach
+    offsets = np.arange(days // 28 + 2)
+    months = _months(first_due)[:, None] + offsets[None, :]
+    month_start = months.astype('datetime64[M]').astype('datetime64[D]')
+    month_length = ((months + 1).astype('datetime64[M]').astype('datetime64[D]') - month_start).astype(np.int64)
+    due_day = np.maximum(np.array([expense.due_day for expense in expenses]), 1)[:, None]
+    # Short months clamp the due day to their last day
+    index = _day_index(month_start + np.minimum(due_day, month_length) - 1, start)
+    # An occurrence that is already due (unpaid) is owed on the first projected day
+    index[:, 0] = np.maximum(index[:, 0], 0)
+
+    rows = np.array([rows_by_account.get(expense.account_id, unassigned) for expense in expenses])
+    amounts = np.array([float(expense.amount) for expense in expenses])
+    valid = (index >= 0) & (index < days)
+    return (
+        np.broadcast_to(rows[:, None], index.shape)[valid],
+        index[valid],
+        -np.broadcast_to(amounts[:, None], index.shape)[valid],
+    )
+
+
+def _debt_flows(debts, start, days):
+    """(day index, amount) of outstanding debts falling due in the horizon; overdue ones on the first day."""
+    if not debts:
+        return np.empty(0, np.int64), np.empty(0)
+    index = np.maximum(_day_index(np.array([debt.due_date for debt in debts], dtype='datetime64[D]'), start), 0)
+    amounts = np.array([float(debt.remaining_amount) * (1 if debt.type == 'OWED_TO_ME' else -1) for debt in debts])
+    valid = index < days
+    return index[valid], amounts[valid]
+
+
+def build_forecast(user, days=DEFAULT_DAYS, today=None):
+    """
+    Day by day balance of every account for the `days` after today: current
+    ledger balances, recurring expenses on their due days, outstanding debts
+    on their due dates and the average daily discretionary spend. Everything
+    is laid out as one (accounts x days) array of flows and summed in a
+    single cumulative sum; five queries whatever the horizon.
+
+    Flows with no account (debts, expenses without a default account, spend
+    from transactions without an account) go to `unassigned` and `total`.
+    """
+    today = today or datetime.date.today()
+    start = today + datetime.timedelta(days=1)
+    accounts = list(Account.objects.filter(user=user).order_by('id'))
+    rows_by_account = {account.id: row for row, account in enumerate(accounts)}
+    unassigned = len(accounts)
+
+    flows = np.zeros((len(accounts) + 1, days))
+
+    rates = discretionary_rates(user, today)
+    daily_spend = np.zeros(len(accounts) + 1)
+    np.add.at(daily_spend, [rows_by_account.get(rate['account_id'], unassigned) for rate in rates],
+              [rate['daily_average'] for rate in rates])
+    flows -= daily_spend[:, None]
+
+    expenses = list(RecurringExpense.objects.filter(user=user, is_active=True))
+    rows, index, amounts = _recurring_outflows(expenses, today, start, days, rows_by_account, unassigned)
+    np.add.at(flows, (rows, index), amounts)
+
+    debts = list(Debt.objects.filter(user=user, is_settled=False, due_date__isnull=False, remaining_amount__gt=0))
+    index, amounts = _debt_flows(debts, start, days)
+    np.add.at(flows[unassigned], index, amounts)
+
+    opening = np.array([float(account.current_balance) for account in accounts] + [0.0])
+    balances = opening[:, None] + np.cumsum(flows, axis=1)
+    total = balances.sum(axis=0)
+    dates = np.arange(np.datetime64(start, 'D'), np.datetime64(start, 'D') + days).astype(str).tolist()
+
+    def series(values):
+        lowest = int(np.argmin(values))
+        return {
+            'balances': np.round(values, 2).tolist(),
+            'lowest_balance': round(float(values[lowest]), 2),
+            'lowest_date': dates[lowest],
+        }
+
+    categories = {}
+    for rate in rates:
+        key = (rate['category__name'], rate['category__color'])
+        categories[key] = categories.get(key, 0) + rate['daily_average']
+
+    return {
+        'start_date': dates[0],
+        'days': days,
+        'dates': dates,
+        'accounts': [
+            {'id': account.id, 'name': account.name, 'color': account.color,
+             'current_balance': float(account.current_balance), **series(balances[row])}
+            for row, account in enumerate(accounts)
+        ],
+        'unassigned': series(balances[unassigned]),
+        'total': series(total),
+        'daily_discretionary_by_category': sorted(
+            ({'category__name': name, 'category__color': color, 'daily_average': round(value, 2)}
+             for (name, color), value in categories.items()),
+            key=lambda row: -row['daily_average'],
+        ),
+    }
@@ -0,0 +1,169 @@
+import csv
+import datetime
+import re
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from .models import Category, Transaction
+from .bulk import bulk_create_transactions, DEFAULT_BATCH_SIZE
+
+MAX_AMOUNT = Decimal('9999999999.99')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+ACCOUNT_PAYMENT_METHODS = {'CASH': 'CASH', 'DEBIT': 'CARD', 'CREDIT': 'CARD'}
+OFX_TOKEN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_CHUNK_SIZE = 64 * 1024
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_amount(value):
+    value = (value or '').strip().replace('$', '').replace(',', '').replace(' ', '')
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise RowError(f'Invalid amount: {value!r}')
+    if not amount.is_finite():
+        raise RowError(f'Invalid amount: {value!r}')
+    return amount
+
+
+def parse_date(value):
+    value = (value or '').strip()
+    # OFX dates: YYYYMMDD[HHMMSS[.XXX]][TZ]
+    if re.match(r'^\d{8}', value):
+        value = value[:8]
+    for fmt in ('%Y%m%d',) + DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f'Invalid date: {value!r}')
+
+
+def iter_csv(stream):
+    """
+    Yield (row number, fields) from a CSV statement with a header row. Needs
+    `date` and `amount` columns; `type`, `description`, `category`,
+    `subcategory` and `payment_method` are optional.
+    """
+    reader = csv.DictReader(stream)
+    fields = {name.strip().lower() for name in reader.fieldnames or []}
+    if not {'date', 'amount'} <= fields:
+        raise ValueError('CSV header must include date and amount columns')
+
+    for row in reader:
+        yield reader.line_num, {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+
+
+def iter_ofx(stream):
+    """Yield (transaction number, fields) from the STMTTRN blocks of an OFX (SGML or XML) statement."""
+    buffer, current, number = '', None, 0
+    while True:
+        chunk = stream.read(OFX_CHUNK_SIZE)
+        buffer += chunk
+        # Keep a possibly incomplete trailing token for the next chunk
+        cut = buffer.rfind('<') if chunk else -1
+        if cut < 0:
+            cut = len(buffer)
+        text, buffer = buffer[:cut], buffer[cut:]
+
+        for closing, tag, value in OFX_TOKEN.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    number += 1
+                    yield number, current
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+        if not chunk:
+            break
+
+
+def ofx_fields(fields):
+    """Map OFX transaction fields to the CSV ones."""
+    return {
+        'date': fields.get('DTPOSTED', ''),
+        'amount': fields.get('TRNAMT', ''),
+        'description': ' - '.join(part for part in (fields.get('NAME'), fields.get('MEMO')) if part),
+    }
+
+
+def build_transaction(user, account, fields, categories):
+    amount = parse_amount(fields.get('amount'))
+    tx_type = (fields.get('type') or '').upper()
+    if tx_type not in ('IN', 'OUT'):
+        if tx_type:
+            raise RowError(f'Invalid type: {tx_type!r}')
+        tx_type = 'OUT' if amount < 0 else 'IN'
+    amount = abs(amount)
+    if amount == 0 or amount > MAX_AMOUNT:
+        raise RowError(f'Amount out of range: {amount}')
+
+    payment_method = (fields.get('payment_method') or '').upper() or ACCOUNT_PAYMENT_METHODS.get(account.type, 'TRANSFER')
+    if payment_method not in dict(Transaction.METHOD_CHOICES):
+        raise RowError(f'Invalid payment_method: {payment_method!r}')
+
+    subcategory = fields.get('subcategory') or None
+    if subcategory and len(subcategory) > 100:
+        raise RowError('subcategory is longer than 100 characters')
+
+    return Transaction(
+        user=user,
+        account=account,
+        category=categories.get(((fields.get('category') or '').lower(), tx_type)),
+        type=tx_type,
+        amount=amount.quantize(Decimal('0.01')),
+        date=parse_date(fields.get('date')),
+        subcategory=subcategory,
+        description=fields.get('description') or None,
+        payment_method=payment_method,
+    )
+
+
+def import_statement(user, account, stream, format='csv', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream a CSV or OFX statement into `account`, inserting in batches inside a
+    single DB transaction. Invalid rows are reported instead of aborting the
+    import. Returns {'created': n, 'errors': [{'row': n, 'error': msg}]}.
+    """
+    if format == 'ofx':
+        rows = ((number, ofx_fields(fields)) for number, fields in iter_ofx(stream))
+    elif format == 'csv':
+        rows = iter_csv(stream)
+    else:
+        raise ValueError(f'Unsupported format: {format}')
+
+    categories = {
+        (category.name.lower(), category.type): category
+        for category in Category.objects.filter(user=user)
+    }
+
+    created, errors, batch = 0, [], []
+    with transaction.atomic():
+        for number, fields in rows:
+            try:
+                batch.append(build_transaction(user, account, fields, categories))
+            except RowError as e:
+                errors.append({'row': number, 'error': str(e)})
+                continue
+
+            if len(batch) >= batch_size:
+                created += len(bulk_create_transactions(batch, batch_size))
+                batch = []
+        created += len(bulk_create_transactions(batch, batch_size))
+
+    return {'created': created, 'errors': errors}
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.ofx', '.qfx')):
+        return 'ofx'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
@@ -0,0 +1,85 @@
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+from django.db import transaction
+from django.db.models import Sum, Q, F
+from .models import Account
+from .caching import record_write
+
+CENTS = Decimal('0.01')
+
+
+def to_decimal(value):
+    # Views create transactions from floats, so normalise before doing money arithmetic
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENTS)
+
+
+def signed_amount(state):
+    """Effect of a transaction state on its account's ledger, or None if it has none."""
+    if state is None or state['is_deleted'] or state['account_id'] is None:
+        return None
+    amount = to_decimal(state['amount'])
+    return amount if state['type'] == 'IN' else -amount
+
+
+def apply_change(previous, current):
+    """
+    Move account ledgers from the `previous` state of a transaction to its
+    `current` one. Either may be None (insert / hard delete). Must run inside
+    the transaction that writes the row.
+    """
+    apply_states(((previous, -1), (current, 1)))
+
+
+def apply_states(changes):
+    """Apply many (state, sign) pairs with one UPDATE per affected account, e.g. after a bulk insert."""
+    deltas = defaultdict(Decimal)
+    for state, sign in changes:
+        amount = signed_amount(state)
+        if amount is not None:
+            deltas[(state['account_id'], state['user_id'])] += sign * amount
+
+    for (account_id, user_id), delta in deltas.items():
+        if delta:
+            # Only the owner's transactions count towards an account, as in the summary
+            Account.objects.filter(pk=account_id, user_id=user_id).update(ledger_balance=F('ledger_balance') + delta)
+
+
+def compute_ledger_balances(accounts):
+    """Full recompute of the ledger for the given accounts: {account_id: IN - OUT}."""
+    active = Q(transactions__is_deleted=False, transactions__user=F('user'))
+    rows = accounts.annotate(
+        incomes=Sum('transactions__amount', filter=active & Q(transactions__type='IN')),
+        expenses=Sum('transactions__amount', filter=active & Q(transactions__type='OUT')),
+    ).values_list('id', 'incomes', 'expenses')
+    return {account_id: (incomes or 0) - (expenses or 0) for account_id, incomes, expenses in rows}
+
+
+def rebuild_balances(accounts=None, repair=True):
+    """
+    Compare stored ledgers against a full recompute and, if `repair`, fix the
+    ones that drifted. Returns a list of (account, stored, expected).
+    """
+    accounts = accounts if accounts is not None else Account.objects.all()
+    expected = compute_ledger_balances(accounts)
+
+    drift = []
+    for account in accounts.order_by('id'):
+        value = to_decimal(expected.get(account.id, 0))
+        if account.ledger_balance != value:
+            drift.append((account, account.ledger_balance, value))
+            if repair:
+                repair_balance(account.pk)
+    return drift
+
+
+def repair_balance(account_id):
+    # Recompute under the row lock so concurrent ledger updates queue behind the repair
+    with transaction.atomic():
+        user_id = Account.objects.select_for_update().filter(pk=account_id).values_list('user_id', flat=True).first()
+        value = compute_ledger_balances(Account.objects.filter(pk=account_id)).get(account_id, 0)
+        Account.objects.filter(pk=account_id).update(ledger_balance=to_decimal(value))
+        # The summary cache keys on the data version, which the QuerySet.update() above does not move
+        transaction.on_commit(partial(record_write, user_id))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from finance.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly category rollups from the raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild the rollups of this username')
+
+    def handle(self, *args, **options):
+        users = None
+        if options['user']:
+            users = get_user_model().objects.filter(username=options['user'])
+
+        written = backfill(users)
+        self.stdout.write(f'Wrote {written} monthly rollup rows.')
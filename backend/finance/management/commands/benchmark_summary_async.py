@@ -0,0 +1,95 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests as http_requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.tokens import AccessToken
+from finance.benchmarks import seed
+
+PATHS = {
+    'sync': '/api/finance/transactions/summary/',
+    'async': '/api/finance/transactions/summary/async/',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the sync and async summary endpoints of a running server with concurrent clients. '
+        'Seeds a throwaway user in the same database first. Start the server with '
+        'CACHE_BACKEND=django.core.cache.backends.dummy.DummyCache to measure uncached summaries, e.g. '
+        '`gunicorn -w 2` (SERVER_MODE=wsgi) against `SERVER_MODE=asgi gunicorn -w 2`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--transactions', type=int, default=20000, help='Transactions of the seeded user')
+        parser.add_argument('--concurrency', default='1,8,32', help='Comma separated concurrent clients')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per path and concurrency level')
+        parser.add_argument('--path', action='append', choices=sorted(PATHS), help='Only these endpoints (repeatable)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded user instead of deleting it')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma separated list of integers')
+
+        with transaction.atomic():
+            user = seed(transactions=options['transactions'], seed=options['seed'], prefix=f'bench-async-{time.time_ns()}')[0]
+        token = str(AccessToken.for_user(user))
+
+        try:
+            results = {}
+            for name in options['path'] or list(PATHS):
+                url = options['base_url'].rstrip('/') + PATHS[name]
+                self.load(url, token, 1)  # warm up connections and imports
+                results[name] = {str(level): self.load(url, token, level, options['requests']) for level in levels}
+        finally:
+            if not options['keep']:
+                user.delete()
+
+        self.stdout.write(json.dumps({'base_url': options['base_url'], 'transactions': options['transactions'], 'results': results}, indent=2))
+
+    def load(self, url, token, concurrency, total=None):
+        total = total or concurrency
+        local = threading.local()
+
+        def fetch(_):
+            # One keep-alive session per client thread
+            if not hasattr(local, 'session'):
+                local.session = http_requests.Session()
+                local.session.headers['Authorization'] = f'Bearer {token}'
+            start = time.perf_counter()
+            try:
+                ok = local.session.get(url, timeout=60).status_code == 200
+            except http_requests.exceptions.RequestException:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for ok, latency in outcomes if ok)
+        if not latencies:
+            raise CommandError(f'Every request to {url} failed; is the server running?')
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))] * 1000, 1)
+
+        return {
+            'requests': total,
+            'errors': sum(1 for ok, _ in outcomes if not ok),
+            'throughput_per_s': round(total / elapsed, 1),
+            'latency_ms': {
+                'mean': round(statistics.fmean(latencies) * 1000, 1),
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': round(latencies[-1] * 1000, 1),
+            },
+        }
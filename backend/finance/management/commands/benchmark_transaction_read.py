@@ -0,0 +1,79 @@
+import datetime
+import json
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+from finance.models import Category, Transaction
+from finance.readers import transaction_rows, serialize_rows
+from finance.serializers import TransactionSerializer
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare TransactionSerializer against the values() read path on a throwaway dataset (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self._seed(options['rows'], options['seed'])
+            queryset = Transaction.objects.filter(user=user).order_by('-date', '-created_at', '-id')
+            renderer = JSONRenderer()
+
+            # .all() so every run hits the database instead of the queryset's result cache
+            paths = {
+                'serializer': lambda: renderer.render(TransactionSerializer(queryset.all(), many=True).data),
+                'read_path': lambda: renderer.render(serialize_rows(transaction_rows(queryset.all()))),
+            }
+            results, outputs = {}, {}
+            for name, render in paths.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    queries = []
+                    with connection.execute_wrapper(lambda execute, *args: queries.append(1) or execute(*args)):
+                        start = time.perf_counter()
+                        outputs[name] = render()
+                        timings.append(time.perf_counter() - start)
+                results[name] = {'best_ms': round(min(timings) * 1000, 1), 'queries': len(queries)}
+
+            if outputs['serializer'] != outputs['read_path']:
+                raise CommandError('Read path output differs from TransactionSerializer')
+
+            transaction.set_rollback(True)
+
+        results['rows'] = options['rows']
+        results['bytes'] = len(outputs['read_path'])
+        results['speedup'] = round(results['serializer']['best_ms'] / max(results['read_path']['best_ms'], 0.1), 1)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _seed(self, rows, seed):
+        rng = random.Random(seed)
+        user = User.objects.create_user(username=f'bench-read-{time.time_ns()}')
+        categories = [
+            Category.objects.create(user=user, name=f'Categoria {i}', type='OUT', color=f'#{i:06d}')
+            for i in range(8)
+        ]
+        today = datetime.date.today()
+        # Raw bulk_create on purpose: the ledger/rollups are irrelevant here and everything is rolled back
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                category=rng.choice(categories + [None]),
+                type=rng.choice(['IN', 'OUT']),
+                amount=Decimal(rng.randint(100, 500000)) / 100,
+                date=today - datetime.timedelta(days=rng.randint(0, 1500)),
+                description=rng.choice(['Uber', 'Súper', 'Renta', None]),
+                payment_method=rng.choice(['CASH', 'CARD', 'TRANSFER']),
+            )
+            for _ in range(rows)
+        ], batch_size=1000)
+        return user
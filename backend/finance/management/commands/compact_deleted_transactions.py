@@ -0,0 +1,20 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from finance.compaction import compact_deleted, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Move transactions deleted longer ago than the retention window into the archive table (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Retention in days (default DELETED_TRANSACTION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else getattr(settings, 'DELETED_TRANSACTION_RETENTION_DAYS', 90)
+        before = timezone.now() - datetime.timedelta(days=days)
+        moved = compact_deleted(before, batch_size=max(1, options['batch_size']), pause=options['pause'])
+        self.stdout.write(f'Archived {moved} transactions deleted before {before:%Y-%m-%d %H:%M}.')
@@ -0,0 +1,38 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from finance.notifications import delivery_stats, format_delivery, WhatsAppSender
+from finance.outbox import drain, MAX_ATTEMPTS
+
+
+class Command(BaseCommand):
+    help = 'Send pending outbox notifications; several workers can run in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, default=0, help='Keep polling every N seconds instead of exiting when empty')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent HTTP requests')
+        parser.add_argument('--rate', type=float, default=5.0, help='Max requests per second to CallMeBot (0 = unlimited)')
+        parser.add_argument('--timeout', type=float, default=15, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        sender = WhatsAppSender(workers=options['workers'], rate=options['rate'], timeout=options['timeout'])
+        try:
+            while True:
+                start = time.perf_counter()
+                deliveries = drain(
+                    sender,
+                    workers=options['workers'],
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    on_delivery=lambda delivery: self.stdout.write(format_delivery(delivery)),
+                )
+                if deliveries:
+                    stats = delivery_stats(deliveries, time.perf_counter() - start)
+                    self.stdout.write(f'Drained. {json.dumps(stats)}')
+                if not options['loop']:
+                    break
+                time.sleep(options['loop'])
+        finally:
+            sender.close()
@@ -0,0 +1,32 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from finance.models import Account
+from finance.bulk import DEFAULT_BATCH_SIZE
+from finance.importers import import_statement, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV or OFX bank statement into an account'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement file')
+        parser.add_argument('--user', required=True, help='Username that owns the account')
+        parser.add_argument('--account', required=True, type=int, help='Target account id')
+        parser.add_argument('--format', choices=['csv', 'ofx'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        account = Account.objects.filter(id=options['account'], user__username=options['user']).select_related('user').first()
+        if not account:
+            raise CommandError('Account not found for that user')
+
+        statement_format = options['format'] or detect_format(options['path'])
+        with open(options['path'], encoding='utf-8-sig', errors='replace', newline='') as stream:
+            try:
+                result = import_statement(account.user, account, stream, statement_format, options['batch_size'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stdout.write(f"  [ERROR] row {error['row']}: {error['error']}")
+        self.stdout.write(json.dumps({'created': result['created'], 'errors': len(result['errors'])}))
@@ -0,0 +1,46 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from finance import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Range partitioning of finance_transaction by date (PostgreSQL only; other databases keep a plain table). '
+        'Once: --convert --granularity year|month. Daily: no options, creates the coming partitions. '
+        'Archiving: --detach-before YYYY-MM-DD [--drop]; the detached rows are folded into the accounts\' '
+        'opening balances and their monthly rollups are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='Rebuild the table as a partitioned table (locks it while copying)')
+        parser.add_argument('--granularity', choices=partitioning.GRANULARITIES, default='year', help='Partition size for --convert')
+        parser.add_argument('--ahead', type=int, default=2, help='Future partitions to keep created')
+        parser.add_argument('--detach-before', type=datetime.date.fromisoformat, help='Detach partitions ending on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--drop', action='store_true', help='Drop detached partitions instead of keeping them as archive tables')
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Run as of this date (YYYY-MM-DD) instead of today')
+
+    def handle(self, *args, **options):
+        if not partitioning.supported(connection):
+            self.stdout.write(f'{partitioning.TABLE} stays a plain table on {connection.vendor}.')
+            return
+        today = options['date'] or datetime.date.today()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            partitioned = partitioning.is_partitioned(cursor)
+            if options['convert']:
+                if partitioned:
+                    raise CommandError(f'{partitioning.TABLE} is already partitioned.')
+                names = partitioning.convert(cursor, options['granularity'], today, options['ahead'])
+                self.stdout.write(f'Partitioned {partitioning.TABLE} by {options["granularity"]} into {len(names)} partitions.')
+                return
+            if not partitioned:
+                self.stdout.write(f'{partitioning.TABLE} is not partitioned; run with --convert first.')
+                return
+
+            created = partitioning.ensure_partitions(cursor, today, options['ahead'])
+            self.stdout.write(f'Created {len(created)} partitions{": " + ", ".join(created) if created else "."}')
+            if options['detach_before']:
+                detached = partitioning.detach_before(cursor, options['detach_before'], drop=options['drop'])
+                action = 'Dropped' if options['drop'] else 'Archived'
+                self.stdout.write(f'{action} {len(detached)} partitions{": " + ", ".join(detached) if detached else "."}')
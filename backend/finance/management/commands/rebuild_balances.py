@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from finance.models import Account
+from finance.ledger import rebuild_balances
+
+
+class Command(BaseCommand):
+    help = 'Verify stored account ledgers against a full recompute of their transactions and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only check the accounts of this username')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.all()
+        if options['user']:
+            accounts = accounts.filter(user__username=options['user'])
+
+        drift = rebuild_balances(accounts, repair=not options['dry_run'])
+
+        for account, stored, expected in drift:
+            self.stdout.write(
+                f'  [DRIFT] account {account.id} ({account.name}): stored {stored}, expected {expected}'
+            )
+
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(f'Checked {accounts.count()} accounts, {action} {len(drift)} with drift.')
@@ -0,0 +1,20 @@
+import datetime
+from django.core.management.base import BaseCommand
+from finance.models import RecurringExpense
+from finance.recurring import reschedule, rollover
+
+
+class Command(BaseCommand):
+    help = 'Move unpaid recurring expenses from earlier months to their due date this month (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Run as of this date (YYYY-MM-DD) instead of today')
+        parser.add_argument('--all', action='store_true', help='Recompute next_due_date for every expense, not just stale ones')
+
+    def handle(self, *args, **options):
+        today = options['date'] or datetime.date.today()
+        if options['all']:
+            changed = reschedule(RecurringExpense.objects.all(), today)
+        else:
+            changed = rollover(today)
+        self.stdout.write(f'Updated the due date of {changed} recurring expenses.')
@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from finance.benchmarks import DEFAULT_SIZES, SCENARIOS, run_suite, compare
+
+
+class Command(BaseCommand):
+    help = 'Time and count queries of the main finance endpoints at several data sizes (rolled back) and print a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='Comma separated transactions per user')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--users', type=int, default=3, help='Seeded users per size (the notification scan covers all of them)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='Only run these scenarios (repeatable)')
+        parser.add_argument('--output', help='Also write the report to this file')
+        parser.add_argument('--compare', help='Previous report to compare against (time ratio and query delta)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+        if options['repeat'] < 1 or not sizes:
+            raise CommandError('Need at least one size and --repeat of 1 or more')
+
+        report = run_suite(
+            sizes=sizes,
+            repeat=options['repeat'],
+            users=options['users'],
+            seed_value=options['seed'],
+            scenarios=options['scenario'],
+        )
+        if options['compare']:
+            with open(options['compare']) as f:
+                report['comparison'] = compare(json.load(f), report)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,53 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from finance.benchmarks import seed
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (users, accounts, categories, recurring expenses, goals, debts and transactions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--accounts', type=int, default=4, help='Accounts per user')
+        parser.add_argument('--categories', type=int, default=10, help='Expense categories per user (a third as many income ones)')
+        parser.add_argument('--recurring', type=int, default=6, help='Recurring expenses per user')
+        parser.add_argument('--goals', type=int, default=3, help='Savings goals per user')
+        parser.add_argument('--debts', type=int, default=3, help='Debts per user')
+        parser.add_argument('--transactions', type=int, default=10000, help='Transactions per user')
+        parser.add_argument('--years', type=int, default=3, help='History length the transactions are spread over')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench', help='Usernames are <prefix>-<seed>-<n>')
+        parser.add_argument('--with-whatsapp', action='store_true',
+                            help='Enable WhatsApp reminders for the seeded users (the daily scan will queue and send them)')
+
+    def handle(self, *args, **options):
+        if options['accounts'] < 1 or options['categories'] < 1:
+            raise CommandError('--accounts and --categories must be at least 1')
+        existing = User.objects.filter(username__startswith=f"{options['prefix']}-{options['seed']}-")
+        if existing.exists():
+            raise CommandError(f"Users {options['prefix']}-{options['seed']}-* already exist; pick another --prefix or --seed")
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = seed(
+                users=options['users'],
+                accounts=options['accounts'],
+                categories=options['categories'],
+                recurring=options['recurring'],
+                goals=options['goals'],
+                debts=options['debts'],
+                transactions=options['transactions'],
+                years=options['years'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                whatsapp=options['with_whatsapp'],
+            )
+        elapsed = time.perf_counter() - start
+
+        total = len(users) * options['transactions']
+        self.stdout.write(f'Seeded {len(users)} users and {total} transactions in {elapsed:.1f}s.')
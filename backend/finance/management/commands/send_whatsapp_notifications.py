@@ -1,88 +1,45 @@
 import datetime
-import calendar
+import json
 import time
-import requests as http_requests
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from finance.models import RecurringExpense
-
-
-User = get_user_model()
-NOTIFY_DAYS = [7, 3]  # Days before due date to send reminders
+from finance.notifications import delivery_stats, format_delivery, WhatsAppSender
+from finance.outbox import enqueue_due_reminders, drain
+from finance.recurring import rollover
 
 
 class Command(BaseCommand):
-    help = 'Send WhatsApp reminders for upcoming recurring expenses (run daily)'
+    help = 'Queue WhatsApp reminders for upcoming recurring expenses in the outbox and send them (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scan-only', action='store_true', help='Only queue reminders; leave sending to drain_notification_outbox')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent HTTP requests')
+        parser.add_argument('--rate', type=float, default=5.0, help='Max requests per second to CallMeBot (0 = unlimited)')
+        parser.add_argument('--timeout', type=float, default=15, help='Per-request timeout in seconds')
 
     def handle(self, *args, **options):
         today = datetime.date.today()
         self.stdout.write(f'[{today}] Checking recurring expense notifications...')
 
-        # Only users who have WhatsApp notifications enabled and configured
-        users = User.objects.filter(
-            whatsapp_enabled=True,
-            whatsapp_phone__isnull=False,
-            whatsapp_apikey__isnull=False,
-        ).exclude(whatsapp_phone='').exclude(whatsapp_apikey='')
+        # Expenses left unpaid in an earlier month are due again this month
+        rolled = rollover(today)
+        if rolled:
+            self.stdout.write(f'Rolled over {rolled} unpaid expenses to this month.')
 
-        if not users.exists():
-            self.stdout.write('No users with WhatsApp notifications enabled.')
+        # All candidate expenses of all enabled users in one query; already queued reminders are skipped
+        queued = enqueue_due_reminders(today)
+        self.stdout.write(f'Queued {queued} new reminders.')
+        if options['scan_only']:
             return
 
-        for user in users:
-            expenses = RecurringExpense.objects.filter(user=user, is_active=True)
-
-            for expense in expenses:
-                # Skip if already paid this month
-                if expense.last_paid_date:
-                    lp = expense.last_paid_date
-                    if lp.month == today.month and lp.year == today.year:
-                        continue
-
-                # Calculate actual due date this month (handle months with fewer days)
-                last_day_of_month = calendar.monthrange(today.year, today.month)[1]
-                due_day = min(expense.due_day, last_day_of_month)
-                due_date = today.replace(day=due_day)
-
-                # If due date already passed this month, skip
-                if due_date < today:
-                    continue
-
-                days_until = (due_date - today).days
-
-                if days_until in NOTIFY_DAYS:
-                    self._send_notification(user, expense, days_until)
-
-        self.stdout.write('Done.')
-
-    def _send_notification(self, user, expense, days_until):
-        if days_until == 1:
-            days_text = 'mañana'
-        else:
-            days_text = f'en {days_until} días'
+        sender = WhatsAppSender(workers=options['workers'], rate=options['rate'], timeout=options['timeout'])
+        start = time.perf_counter()
+        try:
+            deliveries = drain(sender, workers=options['workers'], on_delivery=self.report)
+        finally:
+            sender.close()
 
-        message = (
-            f'*⚠️ Recordatorio de pago*\n'
-            f'_{expense.name}_ se cobra {days_text} '
-            f'(día {expense.due_day}) por ${float(expense.amount):,.2f}.\n'
-            f'Entra a tu app de finanzas para registrarlo.'
-        )
+        stats = delivery_stats(deliveries, time.perf_counter() - start)
+        self.stdout.write(f'Done. {json.dumps(stats)}')
 
-        try:
-            resp = http_requests.get(
-                'https://api.callmebot.com/whatsapp.php',
-                params={
-                    'phone': user.whatsapp_phone.strip().replace('+', ''),
-                    'text': message,
-                    'apikey': user.whatsapp_apikey.strip(),
-                },
-                timeout=15,
-            )
-            status = 'OK' if resp.status_code == 200 else f'ERROR {resp.status_code}'
-            self.stdout.write(
-                f'  [{status}] {user.username} → {expense.name} (en {days_until} días)'
-            )
-        except http_requests.exceptions.RequestException as e:
-            self.stdout.write(
-                f'  [FAIL] {user.username} → {expense.name}: {e}'
-            )
+    def report(self, delivery):
+        self.stdout.write(format_delivery(delivery))
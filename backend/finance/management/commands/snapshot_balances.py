@@ -0,0 +1,27 @@
+import datetime
+from django.core.management.base import BaseCommand
+from finance.models import Account
+from finance.snapshots import take_snapshots, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the daily closing balance snapshots of every account up to yesterday (run nightly). '
+        'Accounts continue from their latest snapshot, so the same run refills days invalidated by back-dated edits; '
+        'accounts without snapshots are backfilled from --since (default: their first transaction).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Last day to snapshot (YYYY-MM-DD, default yesterday)')
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='First day for accounts without snapshots (YYYY-MM-DD)')
+        parser.add_argument('--user', help='Only snapshot the accounts of this username')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Accounts per transaction')
+
+    def handle(self, *args, **options):
+        end = options['date'] or datetime.date.today() - datetime.timedelta(days=1)
+        accounts = Account.objects.all()
+        if options['user']:
+            accounts = accounts.filter(user__username=options['user'])
+
+        written = take_snapshots(end, since=options['since'], accounts=accounts, batch_size=max(1, options['batch_size']))
+        self.stdout.write(f'Wrote {written} balance snapshots up to {end:%Y-%m-%d}.')
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:56
+
+from django.db import migrations, models
+from django.db.models import Sum, Q, F
+
+
+def populate_ledger_balance(apps, schema_editor):
+    Account = apps.get_model('finance', 'Account')
+    active = Q(transactions__is_deleted=False, transactions__user=F('user'))
+    accounts = Account.objects.annotate(
+        incomes=Sum('transactions__amount', filter=active & Q(transactions__type='IN')),
+        expenses=Sum('transactions__amount', filter=active & Q(transactions__type='OUT')),
+    )
+    for account in accounts:
+        ledger = (account.incomes or 0) - (account.expenses or 0)
+        if ledger:
+            Account.objects.filter(pk=account.pk).update(ledger_balance=ledger)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_alter_account_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='ledger_balance',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+        ),
+        migrations.RunPython(populate_ledger_balance, migrations.RunPython.noop),
+    ]
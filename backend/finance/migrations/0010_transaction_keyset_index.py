@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_monthlycategoryrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', '-date', '-created_at', '-id'], name='finance_tx_user_keyset_idx'),
+        ),
+    ]
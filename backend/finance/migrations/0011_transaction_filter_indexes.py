@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_transaction_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'category', '-date', '-created_at', '-id'], name='finance_tx_user_cat_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'account', '-date', '-created_at', '-id'], name='finance_tx_user_acc_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:17
+
+import calendar
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_next_due_date(apps, schema_editor):
+    RecurringExpense = apps.get_model('finance', 'RecurringExpense')
+    today = datetime.date.today()
+    expenses = list(RecurringExpense.objects.only('pk', 'due_day', 'last_paid_date'))
+    for expense in expenses:
+        year, month = today.year, today.month
+        paid = expense.last_paid_date
+        if paid:
+            after = (paid.year + 1, 1) if paid.month == 12 else (paid.year, paid.month + 1)
+            year, month = max((year, month), after)
+        day = min(expense.due_day, calendar.monthrange(year, month)[1])
+        expense.next_due_date = datetime.date(year, month, day)
+    RecurringExpense.objects.bulk_update(expenses, ['next_due_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0013_notificationoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurringexpense',
+            name='next_due_date',
+            field=models.DateField(blank=True, editable=False, help_text='Due date of the earliest unpaid occurrence, kept up to date on save and by the rollover job', null=True),
+        ),
+        migrations.RunPython(populate_next_due_date, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recurringexpense',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['next_due_date'], name='finance_recur_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringexpense',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'next_due_date'], name='finance_recur_user_due_idx'),
+        ),
+    ]
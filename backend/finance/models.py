@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 class Category(models.Model):
@@ -16,6 +16,13 @@ class Category(models.Model):
     def __str__(self):
         return f"{self.name} ({self.type})"
 
+class TransactionManager(models.Manager):
+    """Live transactions: soft deleted rows are left out, which also lets the partial indexes serve every query."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class Transaction(models.Model):
     TYPE_CHOICES = (('IN', 'Ingreso'), ('OUT', 'Egreso'))
     METHOD_CHOICES = (
@@ -37,18 +44,128 @@ class Transaction(models.Model):
     
     is_transfer = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TransactionManager()
+    # Deleted rows included: bookkeeping, compaction and cascades
+    all_objects = models.Manager()
+
     class Meta:
+        base_manager_name = 'all_objects'
         indexes = [
-            models.Index(fields=['user', 'date']),
-            models.Index(fields=['user', 'type']),
+            # (user, date) lookups use the keyset index below
+            models.Index(fields=['user', 'type'], condition=models.Q(is_deleted=False), name='finance_tx_user_type_idx'),
+            # Compaction scans deleted rows oldest first; live rows stay out of it
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='finance_tx_deleted_at_idx'),
+            # Matches the list ordering for keyset pagination over live rows
+            models.Index(
+                fields=['user', '-date', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='finance_tx_user_keyset_idx',
+            ),
+            # List filters (see finance.filters): equality column, then the list ordering
+            # so a filtered page is still a single ordered index range
+            models.Index(
+                fields=['user', 'category', '-date', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='finance_tx_user_cat_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'account', '-date', '-created_at', '-id'],
+                condition=models.Q(is_deleted=False),
+                name='finance_tx_user_acc_date_idx',
+            ),
         ]
+
+    # Fields whose previous values are needed to keep derived data (account ledgers) in sync
+    TRACKED_FIELDS = ('user_id', 'account_id', 'category_id', 'type', 'amount', 'date', 'is_transfer', 'is_deleted')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in instance.__dict__ for field in cls.TRACKED_FIELDS):
+            instance._original_state = instance.tracked_state()
+        return instance
+
+    def tracked_state(self):
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+
+    def save(self, *args, **kwargs):
+        # Derived data is updated from signals, inside the same DB transaction as the row itself
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
         
     def __str__(self):
         return f"{self.amount} - {self.category.name if self.category else 'No Category'}"
 
+class ArchivedTransaction(models.Model):
+    """
+    Transactions soft deleted for longer than the retention window, moved out
+    of finance_transaction by compact_deleted_transactions. Keeps the original
+    id; account and category are plain ids since those may be gone by now.
+    """
+    ARCHIVED_FIELDS = (
+        'id', 'user_id', 'account_id', 'category_id', 'type', 'amount', 'date', 'subcategory',
+        'description', 'payment_method', 'is_transfer', 'created_at', 'updated_at', 'deleted_at',
+    )
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_transactions')
+    account_id = models.BigIntegerField(null=True, blank=True)
+    category_id = models.BigIntegerField(null=True, blank=True)
+    type = models.CharField(max_length=3, choices=Transaction.TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    date = models.DateField()
+    subcategory = models.CharField(max_length=100, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    payment_method = models.CharField(max_length=10, choices=Transaction.METHOD_CHOICES)
+    is_transfer = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def from_transaction(cls, tx):
+        return cls(**{field: getattr(tx, field) for field in cls.ARCHIVED_FIELDS})
+
+    def __str__(self):
+        return f"{self.amount} - archived transaction {self.id}"
+
+class MonthlyCategoryRollup(models.Model):
+    """Per-user monthly totals by category, maintained incrementally by finance.rollups"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='monthly_rollups')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    type = models.CharField(max_length=3, choices=Transaction.TYPE_CHOICES)
+    is_transfer = models.BooleanField(default=False)
+
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'category', 'type', 'is_transfer'],
+                name='unique_monthly_category_rollup',
+            ),
+            # NULLs never conflict in the constraint above, so uncategorized buckets need their own
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'type', 'is_transfer'],
+                condition=models.Q(category__isnull=True),
+                name='unique_monthly_uncategorized_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} {self.type} {self.category_id}: {self.total} ({self.count})"
+
 class SavingsGoal(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='savings_goals')
     name = models.CharField(max_length=150)
@@ -69,6 +186,8 @@ class Debt(models.Model):
         ('OWED_TO_ME', 'Me deben (Por cobrar)'), 
         ('I_OWE', 'Debo (Por pagar)')
     )
+    # Description of the transaction recorded when a payment is made (DebtViewSet.pay)
+    PAYMENT_DESCRIPTION_PREFIX = 'Payment for debt/loan: '
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='debts')
     name = models.CharField(max_length=150) # Name of person/entity
@@ -99,15 +218,46 @@ class Account(models.Model):
     name = models.CharField(max_length=100)
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    # Running sum of the account's transactions (IN - OUT), maintained by finance.ledger
+    ledger_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
     color = models.CharField(max_length=7, default='#97A97C') # Hex
     is_active = models.BooleanField(default=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    @property
+    def current_balance(self):
+        return self.balance + self.ledger_balance
+
+    def save(self, *args, **kwargs):
+        # The ledger only moves through F() updates in finance.ledger: writing back
+        # the value this instance loaded would undo the ones applied since
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'ledger_balance'
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.type}) - ${self.balance}"
 
+class DailyBalanceSnapshot(models.Model):
+    """An account's ledger at the end of a day, filled nightly and invalidated by finance.snapshots"""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    date = models.DateField()
+    # Like Account.ledger_balance: the closing balance is Account.balance plus this
+    ledger_balance = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='unique_daily_balance_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} {self.date}: {self.ledger_balance}"
+
 class RecurringExpense(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recurring_expenses')
     name = models.CharField(max_length=150)
@@ -118,9 +268,61 @@ class RecurringExpense(models.Model):
     due_day = models.IntegerField(help_text="Day of the month this expense is due (1-31)")
     is_active = models.BooleanField(default=True)
     last_paid_date = models.DateField(null=True, blank=True)
+    next_due_date = models.DateField(null=True, blank=True, editable=False, help_text="Due date of the earliest unpaid occurrence, kept up to date on save and by the rollover job")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Reminder scan across all users: due dates N days from today
+            models.Index(fields=['next_due_date'], name='finance_recur_due_idx', condition=models.Q(is_active=True)),
+            # Per-user "unpaid this month" total on the dashboard
+            models.Index(fields=['user', 'next_due_date'], name='finance_recur_user_due_idx', condition=models.Q(is_active=True)),
+        ]
     
     def __str__(self):
         return f"{self.name} - ${self.amount} (Day {self.due_day})"
+
+class NotificationOutbox(models.Model):
+    """One WhatsApp reminder per (user, expense, due date, offset), written by the daily scan and sent by drain workers"""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pendiente'),
+        ('SENDING', 'Enviando'),
+        ('SENT', 'Enviado'),
+        ('FAILED', 'Fallido'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    expense = models.ForeignKey(RecurringExpense, on_delete=models.CASCADE, related_name='notifications')
+    due_date = models.DateField()
+    days_before = models.IntegerField(help_text="Reminder offset: days before the due date")
+    message = models.TextField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(help_text="When the row can next be claimed (retry backoff or claim lease)")
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'expense', 'due_date', 'days_before'],
+                name='unique_notification_per_reminder',
+            ),
+        ]
+        indexes = [
+            # Drain workers only look at rows still waiting to be sent
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status__in=['PENDING', 'SENDING']),
+                name='finance_outbox_claim_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.expense_id} due {self.due_date} (-{self.days_before}d): {self.status}"
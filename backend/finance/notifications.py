@@ -0,0 +1,182 @@
+import datetime
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import requests as http_requests
+from requests.adapters import HTTPAdapter
+from .models import RecurringExpense
+
+CALLMEBOT_URL = 'https://api.callmebot.com/whatsapp.php'
+NOTIFY_DAYS = [7, 3]  # Days before due date to send reminders
+
+
+@dataclass
+class Reminder:
+    user: object
+    expense: RecurringExpense
+    due_date: object
+    days_until: int
+
+    @property
+    def message(self):
+        return build_message(self.expense, self.days_until)
+
+
+@dataclass
+class Delivery:
+    reminder: Reminder
+    ok: bool
+    status: str
+    error: str
+    latency: float
+
+
+def due_reminders(today, notify_days=NOTIFY_DAYS):
+    """
+    Reminders due today for every user with WhatsApp configured, loaded with
+    a single indexed query on next_due_date (expenses joined with their users).
+    """
+    due_dates = [today + datetime.timedelta(days=days) for days in notify_days]
+    expenses = (
+        RecurringExpense.objects.filter(
+            is_active=True,
+            next_due_date__in=due_dates,
+            user__whatsapp_enabled=True,
+            user__whatsapp_phone__isnull=False,
+            user__whatsapp_apikey__isnull=False,
+        )
+        .exclude(user__whatsapp_phone='')
+        .exclude(user__whatsapp_apikey='')
+        .select_related('user')
+        .order_by('user_id', 'due_day')
+    )
+
+    # Paid expenses already point at a later month, so every row is a reminder
+    for expense in expenses:
+        due_date = expense.next_due_date
+        yield Reminder(expense.user, expense, due_date, (due_date - today).days)
+
+
+def build_message(expense, days_until):
+    if days_until == 1:
+        days_text = 'mañana'
+    else:
+        days_text = f'en {days_until} días'
+
+    return (
+        f'*⚠️ Recordatorio de pago*\n'
+        f'_{expense.name}_ se cobra {days_text} '
+        f'(día {expense.due_day}) por ${float(expense.amount):,.2f}.\n'
+        f'Entra a tu app de finanzas para registrarlo.'
+    )
+
+
+class HostRateLimiter:
+    """Spaces out requests so each host gets at most `rate` per second, shared by all worker threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class WhatsAppSender:
+    """CallMeBot client with a pooled keep-alive session sized for the worker pool."""
+
+    def __init__(self, workers=8, rate=None, timeout=15, session=None):
+        self.timeout = timeout
+        self.limiter = HostRateLimiter(rate)
+        self.session = session or http_requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def send(self, phone, apikey, text):
+        """Returns (ok, status, error): status is OK, ERROR <http code> or FAIL."""
+        self.limiter.wait(CALLMEBOT_URL)
+        try:
+            resp = self.session.get(
+                CALLMEBOT_URL,
+                params={
+                    'phone': phone.strip().replace('+', ''),
+                    'text': text,
+                    'apikey': apikey.strip(),
+                },
+                timeout=self.timeout,
+            )
+        except http_requests.exceptions.RequestException as e:
+            return False, 'FAIL', str(e)
+        if resp.status_code == 200:
+            return True, 'OK', ''
+        return False, f'ERROR {resp.status_code}', resp.text[:200]
+
+    def close(self):
+        self.session.close()
+
+
+def deliver(reminders, sender, workers=8, on_delivery=None):
+    """
+    Send reminders (anything with .user and .message) through a bounded thread
+    pool. `on_delivery` is called from the calling thread as results come in.
+    Returns the list of Delivery.
+    """
+    def send(reminder):
+        start = time.perf_counter()
+        ok, status, error = sender.send(
+            reminder.user.whatsapp_phone,
+            reminder.user.whatsapp_apikey,
+            reminder.message,
+        )
+        return Delivery(reminder, ok, status, error, time.perf_counter() - start)
+
+    deliveries = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for delivery in pool.map(send, reminders):
+            deliveries.append(delivery)
+            if on_delivery:
+                on_delivery(delivery)
+    return deliveries
+
+
+def format_delivery(delivery):
+    """One log line per sent outbox row."""
+    row = delivery.reminder
+    if delivery.status == 'FAIL':
+        return f'  [FAIL] {row.user.username} → {row.expense.name}: {delivery.error}'
+    return f'  [{delivery.status}] {row.user.username} → {row.expense.name} (en {row.days_before} días)'
+
+
+def delivery_stats(deliveries, elapsed):
+    latencies = sorted(delivery.latency for delivery in deliveries)
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))]
+
+    return {
+        'sent': sum(1 for delivery in deliveries if delivery.ok),
+        'failed': sum(1 for delivery in deliveries if not delivery.ok),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(deliveries) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+            'p50': round(percentile(0.50) * 1000, 1),
+            'p95': round(percentile(0.95) * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+    }
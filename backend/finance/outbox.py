@@ -0,0 +1,88 @@
+import datetime
+from django.db import transaction
+from django.utils import timezone
+from .models import NotificationOutbox
+from .notifications import due_reminders, deliver
+
+CLAIM_LEASE = datetime.timedelta(minutes=5)
+RETRY_BASE = datetime.timedelta(minutes=1)
+RETRY_MAX = datetime.timedelta(hours=6)
+MAX_ATTEMPTS = 5
+
+
+def enqueue_due_reminders(today):
+    """
+    Write today's reminders into the outbox. The unique key makes re-running
+    the scan a no-op for reminders already queued or sent. Returns how many
+    rows were new.
+    """
+    now = timezone.now()
+    rows = [
+        NotificationOutbox(
+            user=reminder.user,
+            expense=reminder.expense,
+            due_date=reminder.due_date,
+            days_before=reminder.days_until,
+            message=reminder.message,
+            next_attempt_at=now,
+        )
+        for reminder in due_reminders(today)
+    ]
+    before = NotificationOutbox.objects.count()
+    NotificationOutbox.objects.bulk_create(rows, ignore_conflicts=True)
+    return NotificationOutbox.objects.count() - before
+
+
+def claim(batch_size, lease=CLAIM_LEASE):
+    """
+    Claim up to `batch_size` due rows. SKIP LOCKED lets several drain workers
+    run in parallel without picking the same rows; the lease makes rows held
+    by a crashed worker claimable again once it expires.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(status__in=['PENDING', 'SENDING'], next_attempt_at__lte=now)
+            .select_related('user', 'expense')
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        NotificationOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+            status='SENDING', next_attempt_at=now + lease, updated_at=now,
+        )
+    return rows
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def record(delivery, max_attempts=MAX_ATTEMPTS):
+    row = delivery.reminder
+    now = timezone.now()
+    row.attempts += 1
+    if delivery.ok:
+        row.status, row.sent_at, row.last_error = 'SENT', now, ''
+    else:
+        row.last_error = f'{delivery.status} {delivery.error}'.strip()
+        if row.attempts >= max_attempts:
+            row.status = 'FAILED'
+        else:
+            row.status, row.next_attempt_at = 'PENDING', now + retry_delay(row.attempts)
+    row.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'updated_at'])
+
+
+def drain(sender, workers=8, batch_size=100, max_attempts=MAX_ATTEMPTS, on_delivery=None):
+    """Claim and send batches until nothing is due. Returns every Delivery made."""
+    deliveries = []
+    while True:
+        rows = claim(batch_size)
+        if not rows:
+            return deliveries
+
+        def recorded(delivery):
+            record(delivery, max_attempts)
+            if on_delivery:
+                on_delivery(delivery)
+
+        deliveries += deliver(rows, sender, workers=workers, on_delivery=recorded)
@@ -0,0 +1,88 @@
+import base64
+import datetime
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TransactionKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (-date, -created_at, -id): each page seeks past the
+    last row of the previous one, so deep pages cost the same as the first.
+
+    Every list is paginated, TRANSACTIONS_PAGE_SIZE rows per page unless
+    `page_size` asks for another size; clients follow `next`. Searches are
+    not paginated since they are ordered by relevance rather than by the keyset.
+    """
+    ordering = ('-date', '-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'TRANSACTIONS_PAGE_SIZE', 50)
+        maximum = getattr(settings, 'TRANSACTIONS_MAX_PAGE_SIZE', 500)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except ValueError:
+            size = default
+        return max(1, min(size, maximum))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if params.get('search', '').strip():
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = params.get(self.cursor_query_param)
+        if encoded:
+            date, created_at, pk = self.decode_cursor(encoded)
+            # The plain date bound is what the index scan can start from; the OR alone is only a filter
+            queryset = queryset.filter(date__lte=date).filter(
+                Q(date__lt=date)
+                | Q(date=date, created_at__lt=created_at)
+                | Q(date=date, created_at=created_at, id__lt=pk)
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def encode_cursor(self, row):
+        # Rows are values() dicts on the read path, model instances otherwise
+        if not isinstance(row, dict):
+            row = {'date': row.date, 'created_at': row.created_at, 'id': row.pk}
+        position = [row['date'].isoformat(), row['created_at'].isoformat(), row['id']]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            date, created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError
+            return datetime.date.fromisoformat(date), created_at, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
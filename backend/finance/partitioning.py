@@ -0,0 +1,242 @@
+"""
+Range partitioning of finance_transaction by `date` on PostgreSQL.
+
+The model is unchanged: Django keeps treating `id` as the primary key, while
+the table's key becomes (id, date) because PostgreSQL requires the partition
+key in every unique constraint; ids still come from a single sequence. Rows
+outside every range land in a DEFAULT partition and are moved out when their
+partition is created. On other databases the table stays a plain table.
+"""
+import datetime
+import re
+from functools import partial
+from django.db import connection as default_connection, transaction
+from .caching import record_write
+from .models import Transaction, Account, DailyBalanceSnapshot
+
+TABLE = Transaction._meta.db_table
+ACCOUNT_TABLE = Account._meta.db_table
+SNAPSHOT_TABLE = DailyBalanceSnapshot._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+ARCHIVE_PREFIX = f'{TABLE}_archive_'
+GRANULARITIES = ('year', 'month')
+
+_BOUNDS = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+def supported(connection=default_connection):
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(cursor):
+    cursor.execute('SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))', [TABLE])
+    return cursor.fetchone()[0]
+
+
+def period_start(day, granularity):
+    return day.replace(month=1, day=1) if granularity == 'year' else day.replace(day=1)
+
+
+def next_period(start, granularity):
+    if granularity == 'year':
+        return start.replace(year=start.year + 1)
+    return (start + datetime.timedelta(days=32)).replace(day=1)
+
+
+def partition_name(start, granularity):
+    return f'{TABLE}_y{start:%Y}' if granularity == 'year' else f'{TABLE}_m{start:%Y%m}'
+
+
+def partitions(cursor):
+    """(name, start, end) of the range partitions, oldest first; the DEFAULT partition is left out."""
+    cursor.execute(
+        'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+        [TABLE],
+    )
+    found = []
+    for name, bound in cursor.fetchall():
+        match = _BOUNDS.search(bound)
+        if match:
+            found.append((name, *(datetime.date.fromisoformat(value) for value in match.groups())))
+    return sorted(found, key=lambda partition: partition[1])
+
+
+def retained_since(cursor):
+    """Start of the oldest range partition: with older ones detached, the rows before it are archived."""
+    existing = partitions(cursor)
+    return existing[0][1] if existing else None
+
+
+def current_granularity(cursor):
+    existing = partitions(cursor)
+    if not existing:
+        return None
+    _, start, end = existing[-1]
+    return 'year' if (end - start).days > 31 else 'month'
+
+
+def _date_literal(day):
+    return f"'{day.isoformat()}'"
+
+
+def create_partition(cursor, start, granularity):
+    """Create the partition starting at `start`, moving its rows out of the DEFAULT partition first."""
+    end = next_period(start, granularity)
+    name = partition_name(start, granularity)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end],
+    )
+    # Attaching builds the table's indexes, primary key and foreign keys on the partition
+    cursor.execute(
+        f'ALTER TABLE {TABLE} ATTACH PARTITION {name} '
+        f'FOR VALUES FROM ({_date_literal(start)}) TO ({_date_literal(end)})'
+    )
+    return name
+
+
+def ensure_partitions(cursor, today, ahead=2):
+    """Create the partitions from the current period up to `ahead` periods later. Returns their names."""
+    granularity = current_granularity(cursor)
+    if granularity is None:
+        return []
+    existing = {start for _, start, _ in partitions(cursor)}
+    created = []
+    start = period_start(today, granularity)
+    for _ in range(ahead + 1):
+        if start not in existing:
+            created.append(create_partition(cursor, start, granularity))
+        start = next_period(start, granularity)
+    return created
+
+
+def convert(cursor, granularity, today, ahead=2):
+    """
+    Rebuild finance_transaction as a table partitioned by range of `date`,
+    with a partition for every period from the oldest row to `ahead`
+    periods from today. Takes an exclusive lock for the whole copy.
+    Returns the names of the partitions.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unsupported granularity: {granularity}')
+    legacy = f'{TABLE}_unpartitioned'
+
+    # Pending deferred foreign key checks would block the ALTER TABLEs below
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f')",
+        [TABLE],
+    )
+    constraints = cursor.fetchall()
+    primary_key = next(name for name, kind, _ in constraints if kind == 'p')
+    foreign_keys = [(name, definition) for name, kind, definition in constraints if kind == 'f']
+    cursor.execute(
+        'SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i '
+        'JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary',
+        [TABLE],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(f'SELECT min(date), max(date), coalesce(max(id), 0) FROM {TABLE}')
+    first_day, last_day, max_id = cursor.fetchone()
+
+    # Free the names (constraints, indexes, id sequence) for the new table
+    cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+    cursor.execute(f'ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY IF EXISTS')
+    cursor.execute(f'ALTER TABLE {legacy} ALTER COLUMN id DROP DEFAULT')
+    cursor.execute(f'DROP SEQUENCE IF EXISTS {TABLE}_id_seq')
+    for name, _ in foreign_keys:
+        cursor.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT {name}')
+    cursor.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT {primary_key}')
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX {name}')
+
+    cursor.execute(f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (date)')
+    # A plain sequence: identity columns on partitioned tables need PostgreSQL 17
+    cursor.execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+    cursor.execute(f"SELECT setval('{TABLE}_id_seq', %s, false)", [max_id + 1])
+    cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+
+    cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+    names = []
+    start = period_start(min(first_day or today, today), granularity)
+    until = period_start(max(last_day or today, today), granularity)
+    for _ in range(ahead):
+        until = next_period(until, granularity)
+    while start <= until:
+        names.append(partition_name(start, granularity))
+        cursor.execute(
+            f'CREATE TABLE {names[-1]} PARTITION OF {TABLE} '
+            f'FOR VALUES FROM ({_date_literal(start)}) TO ({_date_literal(next_period(start, granularity))})'
+        )
+        start = next_period(start, granularity)
+
+    # Load before indexing: one index build per partition instead of row by row maintenance
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {legacy}')
+    cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {primary_key} PRIMARY KEY (id, date)')
+    for _, definition in indexes:
+        # Captured before the rename, so they already target the new table
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+    cursor.execute(f'DROP TABLE {legacy}')
+    cursor.execute(f'ANALYZE {TABLE}')
+    return names
+
+
+def fold_into_opening_balances(cursor, name, end):
+    """
+    Move the ledger contribution of partition `name` (rows before `end`)
+    into Account.balance, so current balances and later snapshots keep
+    their values once the rows are gone. Snapshots before `end` describe
+    archived history and are dropped.
+    """
+    # Writers to the partition would change the net between the sum and the detach
+    cursor.execute(f'LOCK TABLE {name} IN SHARE MODE')
+    # Same rows as finance.ledger: live, with an account owned by the transaction's user
+    cursor.execute(
+        f"SELECT t.account_id, a.user_id, SUM(CASE WHEN t.type = 'IN' THEN t.amount ELSE -t.amount END) FROM {name} t "
+        f"JOIN {ACCOUNT_TABLE} a ON a.id = t.account_id AND a.user_id = t.user_id "
+        f"WHERE NOT t.is_deleted GROUP BY t.account_id, a.user_id"
+    )
+    users = set()
+    for account_id, user_id, net in cursor.fetchall():
+        users.add(user_id)
+        cursor.execute(
+            f'UPDATE {ACCOUNT_TABLE} SET balance = balance + %s, ledger_balance = ledger_balance - %s WHERE id = %s',
+            [net, net, account_id],
+        )
+        cursor.execute(
+            f'UPDATE {SNAPSHOT_TABLE} SET ledger_balance = ledger_balance - %s WHERE account_id = %s AND date >= %s',
+            [net, account_id, end],
+        )
+    cursor.execute(f'DELETE FROM {SNAPSHOT_TABLE} WHERE date < %s', [end])
+    # Raw SQL leaves the data versions alone: cached summaries and ETags would outlive the move
+    for user_id in users:
+        transaction.on_commit(partial(record_write, user_id), using=cursor.db.alias)
+
+
+def detach_before(cursor, before, drop=False):
+    """
+    Detach the partitions that end on or before `before`. They are kept as
+    standalone finance_transaction_archive_* tables unless `drop` is set.
+    Their net is folded into the accounts' opening balances first, so
+    balances, ledger rebuilds and balance histories stay consistent with
+    the rows that remain. Returns the names of the detached partitions.
+    """
+    detached = []
+    for name, _, end in partitions(cursor):
+        if end > before:
+            continue
+        fold_into_opening_balances(cursor, name, end)
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        if drop:
+            cursor.execute(f'DROP TABLE {name}')
+        else:
+            cursor.execute(f'ALTER TABLE {name} RENAME TO {ARCHIVE_PREFIX}{name[len(TABLE) + 1:]}')
+        detached.append(name)
+    return detached
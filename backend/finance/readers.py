@@ -0,0 +1,68 @@
+from decimal import Decimal
+from django.utils import timezone
+
+CENTS = Decimal('0.01')
+
+# (output key, values() lookup) in TransactionSerializer's field order
+TRANSACTION_READ_FIELDS = (
+    ('id', 'id'),
+    ('category_name', 'category__name'),
+    ('category_color', 'category__color'),
+    ('type', 'type'),
+    ('amount', 'amount'),
+    ('date', 'date'),
+    ('subcategory', 'subcategory'),
+    ('description', 'description'),
+    ('payment_method', 'payment_method'),
+    ('is_transfer', 'is_transfer'),
+    ('is_deleted', 'is_deleted'),
+    ('deleted_at', 'deleted_at'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('user', 'user_id'),
+    ('account', 'account_id'),
+    ('category', 'category_id'),
+)
+# TransactionSerializer skips these keys when the transaction has no category
+CATEGORY_SOURCED = ('category_name', 'category_color')
+
+
+def transaction_rows(queryset):
+    """values() queryset with the category columns joined in, no model instances."""
+    return queryset.values(*(lookup for _, lookup in TRANSACTION_READ_FIELDS))
+
+
+def format_datetime(value, tz=None):
+    # Same as DRF's DateTimeField: current timezone, ISO 8601, UTC as 'Z'
+    if timezone.is_aware(value):
+        value = value.astimezone(tz or timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def serialize_row(row, tz=None):
+    """Render a transaction_rows() row exactly as TransactionSerializer would."""
+    tz = tz or timezone.get_current_timezone()
+    data = {}
+    has_category = row['category_id'] is not None
+    for key, lookup in TRANSACTION_READ_FIELDS:
+        if key in CATEGORY_SOURCED and not has_category:
+            continue
+        value = row[lookup]
+        if value is not None:
+            if key == 'amount':
+                value = '{:f}'.format(value.quantize(CENTS))
+            elif key == 'date':
+                value = value.isoformat()
+            elif key in ('deleted_at', 'created_at', 'updated_at'):
+                value = format_datetime(value, tz)
+        data[key] = value
+    return data
+
+
+def serialize_rows(rows):
+    # Resolving the current timezone is relatively costly, so do it once per response
+    tz = timezone.get_current_timezone()
+    return [serialize_row(row, tz) for row in rows]
@@ -0,0 +1,46 @@
+import calendar
+import datetime
+from .models import RecurringExpense
+
+BULK_BATCH_SIZE = 1000
+# Description of the transaction recorded when an expense is paid (RecurringExpenseViewSet.pay)
+PAYMENT_DESCRIPTION_PREFIX = 'Pago automatizado: '
+
+
+def due_date_in_month(due_day, year, month):
+    # Months with fewer days clamp the due day to their last day
+    return datetime.date(year, month, min(due_day, calendar.monthrange(year, month)[1]))
+
+
+def next_due_date(due_day, last_paid_date=None, today=None):
+    """
+    Due date of the earliest unpaid occurrence: the month after the last
+    payment, or the current month if that one has already passed (missed
+    months are not carried over, the expense is simply due again).
+    """
+    today = today or datetime.date.today()
+    year, month = today.year, today.month
+    if last_paid_date:
+        paid = last_paid_date
+        after = (paid.year + 1, 1) if paid.month == 12 else (paid.year, paid.month + 1)
+        year, month = max((year, month), after)
+    return due_date_in_month(due_day, year, month)
+
+
+def reschedule(expenses, today=None):
+    """Recompute next_due_date for the given expenses as of `today`. Returns the number of rows changed."""
+    changed = []
+    for expense in expenses.only('pk', 'due_day', 'last_paid_date', 'next_due_date'):
+        due = next_due_date(expense.due_day, expense.last_paid_date, today)
+        if due != expense.next_due_date:
+            expense.next_due_date = due
+            changed.append(expense)
+    RecurringExpense.objects.bulk_update(changed, ['next_due_date'], batch_size=BULK_BATCH_SIZE)
+    return len(changed)
+
+
+def rollover(today=None):
+    """Move expenses whose due date fell in an earlier month (and were never paid) to the current one."""
+    today = today or datetime.date.today()
+    stale = RecurringExpense.objects.filter(is_active=True, next_due_date__lt=today.replace(day=1))
+    return reschedule(stale, today)
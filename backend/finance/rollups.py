@@ -0,0 +1,109 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum, Count, F, Q
+from django.db.models.functions import ExtractYear, ExtractMonth
+from .models import Transaction, MonthlyCategoryRollup
+from .ledger import to_decimal
+from .caching import record_write
+from . import partitioning
+
+BULK_BATCH_SIZE = 1000
+
+
+def as_date(value):
+    # Views pass request dates straight through, so the instance may still hold a string
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def bucket_key(state):
+    date = as_date(state['date'])
+    return (state['user_id'], date.year, date.month, state['category_id'], state['type'], bool(state['is_transfer']))
+
+
+def add_to_bucket(key, amount, count):
+    user_id, year, month, category_id, type, is_transfer = key
+    filters = dict(user_id=user_id, year=year, month=month, category_id=category_id, type=type, is_transfer=is_transfer)
+
+    pk = MonthlyCategoryRollup.objects.filter(**filters).values_list('pk', flat=True).first()
+    if pk is None:
+        try:
+            # In a savepoint: when a concurrent first write to the bucket wins, add to its row instead
+            with transaction.atomic():
+                MonthlyCategoryRollup.objects.create(total=amount, count=count, **filters)
+            return
+        except IntegrityError:
+            pk = MonthlyCategoryRollup.objects.filter(**filters).values_list('pk', flat=True).first()
+    MonthlyCategoryRollup.objects.filter(pk=pk).update(total=F('total') + amount, count=F('count') + count)
+
+
+def apply_change(previous, current):
+    """Move a transaction's contribution between monthly buckets (previous/current may be None)."""
+    apply_states(((previous, -1), (current, 1)))
+
+
+def apply_states(changes):
+    """Apply many (state, sign) pairs with one write per affected bucket, e.g. after a bulk insert."""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for state, sign in changes:
+        if state is None or state['is_deleted']:
+            continue
+        delta = deltas[bucket_key(state)]
+        delta[0] += sign * to_decimal(state['amount'])
+        delta[1] += sign
+
+    for key, (amount, count) in deltas.items():
+        if amount or count:
+            add_to_bucket(key, amount, count)
+
+
+def merge_category_into_uncategorized(category):
+    """Fold a category's buckets into the uncategorized ones before it is deleted."""
+    rows = list(MonthlyCategoryRollup.objects.filter(category=category))
+    for row in rows:
+        add_to_bucket((row.user_id, row.year, row.month, None, row.type, row.is_transfer), row.total, row.count)
+    MonthlyCategoryRollup.objects.filter(pk__in=[row.pk for row in rows]).delete()
+
+
+def backfill(users=None):
+    """
+    Rebuild the rollup from raw transactions with one grouped query. On a
+    partitioned table only the months still in partitions are rebuilt;
+    the ones archived by detaching keep their rollups. Returns the number
+    of rows written.
+    """
+    transactions = Transaction.objects.all()
+    rollups = MonthlyCategoryRollup.objects.all()
+    if users is not None:
+        transactions = transactions.filter(user__in=users)
+        rollups = rollups.filter(user__in=users)
+    since = None
+    if partitioning.supported(connection):
+        with connection.cursor() as cursor:
+            since = partitioning.retained_since(cursor) if partitioning.is_partitioned(cursor) else None
+    if since is not None:
+        transactions = transactions.filter(date__gte=since)
+        rollups = rollups.filter(Q(year__gt=since.year) | Q(year=since.year, month__gte=since.month))
+
+    grouped = (
+        transactions.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('user_id', 'year', 'month', 'category_id', 'type', 'is_transfer')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        affected = set(rollups.values_list('user_id', flat=True).distinct())
+        rollups.delete()
+        created = MonthlyCategoryRollup.objects.bulk_create(
+            (MonthlyCategoryRollup(**row) for row in grouped.iterator()),
+            batch_size=BULK_BATCH_SIZE,
+        )
+        # Summaries read the rollup, so every user whose rows were rewritten needs a new cache version
+        for user_id in affected | {rollup.user_id for rollup in created}:
+            transaction.on_commit(partial(record_write, user_id))
+    return len(created)
@@ -32,7 +32,7 @@ class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
         fields = '__all__'
-        read_only_fields = ('user',)
+        read_only_fields = ('user', 'ledger_balance')
 
 class RecurringExpenseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,86 @@
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, Transaction, Account, RecurringExpense, SavingsGoal, Debt
+from . import ledger, rollups, recurring, snapshots
+from .caching import record_write
+
+VERSIONED_MODELS = (Category, Transaction, Account, RecurringExpense, SavingsGoal, Debt)
+
+
+def deleting_user(origin):
+    # Deleting a user cascades to their ledgers and rollups too, so there is nothing left to keep in sync
+    meta = getattr(getattr(origin, 'model', origin), '_meta', None)
+    return meta is not None and meta.label == settings.AUTH_USER_MODEL
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction_state(sender, instance, raw, **kwargs):
+    # Instances not loaded through from_db (or loaded with deferred fields) need their stored state fetched
+    if raw or instance._state.adding or getattr(instance, '_original_state', None) is not None:
+        return
+    instance._original_state = (
+        Transaction.all_objects.filter(pk=instance.pk).values(*Transaction.TRACKED_FIELDS).first()
+    )
+
+
+@receiver(pre_save, sender=Transaction)
+def stamp_deletion(sender, instance, raw, **kwargs):
+    # Compaction archives rows by how long they have been deleted
+    if raw:
+        return
+    if not instance.is_deleted:
+        instance.deleted_at = None
+    elif instance.deleted_at is None:
+        instance.deleted_at = timezone.now()
+
+
+@receiver(post_save, sender=Transaction)
+def sync_transaction_change(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._original_state
+    current = instance.tracked_state()
+    ledger.apply_change(previous, current)
+    rollups.apply_change(previous, current)
+    snapshots.apply_change(previous, current)
+    instance._original_state = current
+
+
+@receiver(post_delete, sender=Transaction)
+def sync_transaction_delete(sender, instance, origin=None, **kwargs):
+    if deleting_user(origin):
+        return
+    previous = getattr(instance, '_original_state', None) or instance.tracked_state()
+    ledger.apply_change(previous, None)
+    rollups.apply_change(previous, None)
+    snapshots.apply_change(previous, None)
+
+
+@receiver(pre_save, sender=RecurringExpense)
+def schedule_recurring_expense(sender, instance, raw, **kwargs):
+    # Any edit (due day, payment, reactivation) can move the next due date
+    if raw:
+        return
+    instance.next_due_date = recurring.next_due_date(instance.due_day, instance.last_paid_date)
+
+
+@receiver(pre_delete, sender=Category)
+def merge_category_rollups(sender, instance, origin=None, **kwargs):
+    if deleting_user(origin):
+        return
+    # Transactions fall back to "no category" via SET_NULL, so their monthly totals do too
+    rollups.merge_category_into_uncategorized(instance)
+
+
+def bump_user_data_version(sender, instance, **kwargs):
+    # After commit, so a concurrent reader can never cache pre-write data under the new version
+    transaction.on_commit(partial(record_write, instance.user_id))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_user_data_version, sender=model, dispatch_uid=f'bump_data_version_{model.__name__}')
+    post_delete.connect(bump_user_data_version, sender=model, dispatch_uid=f'bump_data_version_delete_{model.__name__}')
@@ -0,0 +1,111 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Sum, When
+from .models import Account, DailyBalanceSnapshot, Transaction
+from .ledger import signed_amount, to_decimal
+from .rollups import as_date
+
+BULK_BATCH_SIZE = 1000
+DEFAULT_BATCH_SIZE = 200
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def _signed():
+    return Case(When(type='IN', then=F('amount')), default=-F('amount'))
+
+
+def _ledger_transactions(account_ids):
+    # Only the owner's transactions count towards an account, as in finance.ledger
+    return Transaction.objects.filter(account_id__in=account_ids, user=F('account__user'))
+
+
+def apply_change(previous, current):
+    """Drop the snapshots a transaction change makes stale (previous/current may be None)."""
+    apply_states(((previous, -1), (current, 1)))
+
+
+def apply_states(changes):
+    """
+    Apply many (state, sign) pairs, e.g. after a bulk insert: per affected
+    account, delete the snapshots from the earliest day whose balance moved.
+    Edits that leave every balance as it was keep them all.
+    """
+    deltas = defaultdict(Decimal)
+    for state, sign in changes:
+        amount = signed_amount(state)
+        if amount is not None:
+            deltas[(state['account_id'], as_date(state['date']))] += sign * amount
+
+    earliest = {}
+    for (account_id, date), delta in deltas.items():
+        if delta and date < earliest.get(account_id, datetime.date.max):
+            earliest[account_id] = date
+    for account_id, date in earliest.items():
+        DailyBalanceSnapshot.objects.filter(account_id=account_id, date__gte=date).delete()
+
+
+def take_snapshots(end, since=None, accounts=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Bring the daily snapshots of every account up to `end`. Each account
+    continues from its latest snapshot; one without any starts at `since`
+    (default: its first transaction), so the same call does the nightly run,
+    the refill after invalidations and the initial backfill. Works through
+    `batch_size` accounts per transaction. Returns the number of snapshots written.
+    """
+    accounts = accounts if accounts is not None else Account.objects.all()
+    account_ids = list(accounts.order_by('id').values_list('id', flat=True))
+    written = 0
+    for i in range(0, len(account_ids), batch_size):
+        with transaction.atomic():
+            written += _fill(account_ids[i:i + batch_size], end, since)
+    return written
+
+
+def _fill(account_ids, end, since):
+    latest = DailyBalanceSnapshot.objects.filter(account=OuterRef('pk'), date__lte=end).order_by('-date')
+    # Locked like the ledger updates, so no write can land between the read and the insert
+    accounts = list(
+        Account.objects.select_for_update().filter(pk__in=account_ids)
+        .annotate(last_date=Subquery(latest.values('date')[:1]), last_ledger=Subquery(latest.values('ledger_balance')[:1]))
+        .values_list('id', 'last_date', 'last_ledger')
+    )
+
+    transactions = _ledger_transactions(account_ids).filter(date__lte=end)
+    if all(last_date is not None for _, last_date, _ in accounts):
+        transactions = transactions.filter(date__gt=min(last_date for _, last_date, _ in accounts))
+    nets = defaultdict(dict)
+    for row in transactions.values('account_id', 'date').annotate(net=Sum(_signed())).order_by():
+        nets[row['account_id']][row['date']] = row['net']
+
+    snapshots = []
+    for account_id, last_date, last_ledger in accounts:
+        days = nets[account_id]
+        if last_date is not None:
+            day, ledger = last_date + ONE_DAY, last_ledger
+        else:
+            day = since or min(days, default=end)
+            ledger = sum((net for date, net in days.items() if date < day), Decimal('0'))
+        while day <= end:
+            ledger += days.get(day, 0)
+            snapshots.append(DailyBalanceSnapshot(account_id=account_id, date=day, ledger_balance=to_decimal(ledger)))
+            day += ONE_DAY
+    DailyBalanceSnapshot.objects.bulk_create(snapshots, batch_size=BULK_BATCH_SIZE)
+    return len(snapshots)
+
+
+def balance_as_of(account, date):
+    """
+    Closing balance of `account` at the end of `date`: the nearest snapshot
+    on or before it plus the transactions after the snapshot, instead of
+    the whole history. Returns (balance, snapshot date or None).
+    """
+    snapshot = account.balance_snapshots.filter(date__lte=date).order_by('-date').values_list('date', 'ledger_balance').first()
+    transactions = _ledger_transactions([account.pk]).filter(date__lte=date)
+    ledger = Decimal('0')
+    if snapshot is not None:
+        transactions = transactions.filter(date__gt=snapshot[0])
+        ledger = snapshot[1]
+    ledger += transactions.aggregate(total=Sum(_signed()))['total'] or 0
+    return account.balance + to_decimal(ledger), snapshot[0] if snapshot else None
@@ -0,0 +1,198 @@
+import asyncio
+import calendar
+import datetime
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Sum
+from rest_framework.exceptions import ValidationError
+from config.middleware import run_tracked
+from .filters import month_range
+from .models import Transaction, Account, RecurringExpense, MonthlyCategoryRollup
+
+DAILY_SERIES_DAYS = 7
+
+
+def _category_rows(rows):
+    # Rows grouped by category are already ordered by '-total'
+    return [
+        {'category__name': row['category__name'], 'category__color': row['category__color'], 'total': row['total']}
+        for row in rows
+    ]
+
+
+def period_breakdown(user, month=None, year=None):
+    """
+    Totals and category breakdowns for both types in a single GROUP BY over
+    the monthly rollup, so long histories cost one row per month and category.
+    Raises ValidationError for a month/year that is not a valid month.
+    """
+    rollups = MonthlyCategoryRollup.objects.filter(user=user, is_transfer=False, count__gt=0)
+    if month and year:
+        try:
+            year, month = int(year), int(month)
+        except ValueError:
+            raise ValidationError({'month': 'Invalid month/year.'})
+        month_range(year, month)
+        rollups = rollups.filter(year=year, month=month)
+    by_category = (
+        rollups.values('type', 'category__name', 'category__color')
+        .annotate(total=Sum('total'))
+        .order_by('-total')
+    )
+    grouped = {'IN': [], 'OUT': []}
+    for row in by_category:
+        grouped[row['type']].append(row)
+    return grouped
+
+
+def account_balances(user):
+    # Account balances include transfers and ALL history; the running ledger
+    # is maintained on every transaction write so this is a single read
+    return [
+        {
+            'id': account.id,
+            'name': account.name,
+            'type': account.type,
+            'color': account.color,
+            'calculated_balance': account.current_balance,
+        }
+        for account in Account.objects.filter(user=user).order_by('id')
+    ]
+
+
+def upcoming_fixed_expenses(user, today):
+    # Fixed expenses not yet paid this month: anything due by the end of the
+    # month, including earlier months the rollover job has not moved yet
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    return RecurringExpense.objects.filter(
+        user=user, is_active=True, next_due_date__lte=month_end,
+    ).aggregate(total=Sum('amount'))['total'] or 0
+
+
+def daily_expenses(user, today):
+    # Daily expense series, one GROUP BY over the whole window
+    start = today - datetime.timedelta(days=DAILY_SERIES_DAYS - 1)
+    rows = (
+        Transaction.objects.filter(user=user, type='OUT', is_transfer=False, date__gte=start, date__lte=today)
+        .values('date', 'category__name', 'category__color')
+        .annotate(total=Sum('amount'))
+        .order_by('date', '-total')
+    )
+    days = defaultdict(list)
+    for row in rows:
+        days[row['date']].append(row)
+
+    series = []
+    for i in range(DAILY_SERIES_DAYS - 1, -1, -1):
+        day = today - datetime.timedelta(days=i)
+        day_rows = days.get(day, [])
+        series.append({
+            'date': day.strftime('%Y-%m-%d'),
+            'total': sum((row['total'] for row in day_rows), 0),
+            'categories': _category_rows(day_rows),
+        })
+    return series
+
+
+def _aggregates(user, month, year, today):
+    # Independent of each other: the async builder runs them concurrently
+    return [
+        (period_breakdown, (user, month, year)),
+        (account_balances, (user,)),
+        (upcoming_fixed_expenses, (user, today)),
+        (daily_expenses, (user, today)),
+    ]
+
+
+def _assemble(grouped, accounts, upcoming, daily_series):
+    incomes = sum((row['total'] for row in grouped['IN']), 0)
+    expenses = sum((row['total'] for row in grouped['OUT']), 0)
+    return {
+        'balance': incomes - expenses,
+        'total_income': incomes,
+        'total_expense': expenses,
+        'expenses_by_category': _category_rows(grouped['OUT']),
+        'incomes_by_category': _category_rows(grouped['IN']),
+        'accounts': accounts,
+        'upcoming_fixed_expenses': upcoming,
+        'last_7_days_expenses': daily_series,
+    }
+
+
+def build_summary(user, month=None, year=None, today=None):
+    """
+    Dashboard summary computed with a fixed number of grouped queries:
+    one over the monthly rollup for the period totals and category
+    breakdowns, one for the account ledgers, one SUM over the recurring
+    expenses due this month and one for the daily series.
+    """
+    today = today or datetime.date.today()
+    return _assemble(*(aggregate(*args) for aggregate, args in _aggregates(user, month, year, today)))
+
+
+_fanout_executor = None
+_fanout_lock = threading.Lock()
+
+
+def fanout_executor():
+    # Created lazily so each gunicorn worker process gets its own threads
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is None:
+            _fanout_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SUMMARY_FANOUT_THREADS', 8),
+                thread_name_prefix='summary-fanout',
+            )
+    return _fanout_executor
+
+
+def shutdown_fanout():
+    """Close the connections of the pool threads and stop them."""
+    global _fanout_executor
+    with _fanout_lock:
+        executor, _fanout_executor = _fanout_executor, None
+    if executor is None:
+        return
+    # One task per possible thread: the barrier keeps a thread from taking a second one
+    threads = getattr(settings, 'SUMMARY_FANOUT_THREADS', 8)
+    barrier = threading.Barrier(threads)
+
+    def close():
+        connections.close_all()
+        barrier.wait()
+
+    for _ in range(threads):
+        executor.submit(close)
+    executor.shutdown(wait=True)
+
+
+def _in_worker_thread(aggregate, *args):
+    # Pool threads never see request_started/request_finished, so apply the same
+    # connection handling around each aggregate: CONN_MAX_AGE decides whether the
+    # thread keeps its connection, and a broken one is dropped instead of reused
+    close_old_connections()
+    try:
+        return run_tracked(aggregate, *args)
+    finally:
+        close_old_connections()
+
+
+async def abuild_summary(user, month=None, year=None, today=None):
+    """
+    Same result as build_summary, with the four queries in flight at once.
+
+    Django's async ORM still funnels every query through one shared thread,
+    so each aggregate runs on a thread of a dedicated pool (and therefore
+    on that thread's own database connection).
+    """
+    today = today or datetime.date.today()
+    executor = fanout_executor()
+    parts = await asyncio.gather(*(
+        sync_to_async(_in_worker_thread, thread_sensitive=False, executor=executor)(aggregate, *args)
+        for aggregate, args in _aggregates(user, month, year, today)
+    ))
+    return _assemble(*parts)
@@ -1,3 +1,1494 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import threading
+import time
+from decimal import Decimal
+import os
+import tempfile
+from io import StringIO
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import QuerySet
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from unittest import skipIf, skipUnless, mock
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from asgiref.sync import async_to_sync
+from prometheus_client import REGISTRY
+from config import routers
+from . import analytics, benchmarks, forecast, importers, ledger, notifications, outbox, partitioning, recurring, rollups, snapshots, summary
+from .bulk import bulk_create_transactions
+from .caching import SUMMARY_TIMEOUT, get_data_version
+from .filters import TransactionFilterBackend
+from .pagination import TransactionKeysetPagination
+from .serializers import TransactionSerializer
+from .models import Category, Transaction, ArchivedTransaction, Account, Debt, RecurringExpense, SavingsGoal, MonthlyCategoryRollup, NotificationOutbox
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FinanceFixtures:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = datetime.date.today()
+        self.food = Category.objects.create(user=self.user, name='Comida', type='OUT', color='#FF0000')
+        self.salary = Category.objects.create(user=self.user, name='Sueldo', type='IN', color='#00FF00')
+
+    def make_account(self, name='Banco', balance='0.00'):
+        return Account.objects.create(user=self.user, name=name, type='DEBIT', balance=Decimal(balance))
+
+    def make_transaction(self, account=None, type='OUT', amount='10.00', date=None, category=None, **kwargs):
+        return Transaction.objects.create(
+            user=self.user,
+            account=account,
+            category=category,
+            type=type,
+            amount=Decimal(amount),
+            date=date or self.today,
+            payment_method=kwargs.pop('payment_method', 'CASH'),
+            **kwargs
+        )
+
+
+# The test replica reads through a connection of its own, which cannot see the
+# uncommitted data of a TestCase
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, REPLICA_READS=False)
+class FinanceTestCase(FinanceFixtures, TestCase):
+    pass
+
+
+class SummaryTests(FinanceTestCase):
+    def get_summary(self, **params):
+        response = self.client.get('/api/finance/transactions/summary/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_totals_and_breakdowns(self):
+        account = self.make_account(balance='100.00')
+        other = self.make_account(name='Efectivo')
+        self.make_transaction(account, 'IN', '500.00', category=self.salary)
+        self.make_transaction(account, 'OUT', '120.50', category=self.food)
+        self.make_transaction(account, 'OUT', '30.00', date=self.today - datetime.timedelta(days=2), category=self.food)
+        self.make_transaction(account, 'OUT', '50.00', is_transfer=True, payment_method='TRANSFER')
+        self.make_transaction(other, 'IN', '50.00', is_transfer=True, payment_method='TRANSFER')
+        self.make_transaction(account, 'OUT', '999.00', is_deleted=True)
+        RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('800.00'), due_day=5)
+        RecurringExpense.objects.create(user=self.user, name='Internet', amount=Decimal('400.00'), due_day=5, last_paid_date=self.today)
+
+        data = self.get_summary()
+
+        self.assertEqual(data['total_income'], Decimal('500.00'))
+        self.assertEqual(data['total_expense'], Decimal('150.50'))
+        self.assertEqual(data['balance'], Decimal('349.50'))
+        self.assertEqual(data['expenses_by_category'], [
+            {'category__name': 'Comida', 'category__color': '#FF0000', 'total': Decimal('150.50')},
+        ])
+        self.assertEqual(data['upcoming_fixed_expenses'], Decimal('800.00'))
+        balances = {row['id']: row['calculated_balance'] for row in data['accounts']}
+        self.assertEqual(balances, {account.id: Decimal('399.50'), other.id: Decimal('50.00')})
+
+        series = data['last_7_days_expenses']
+        self.assertEqual(len(series), 7)
+        self.assertEqual(series[-1]['date'], self.today.strftime('%Y-%m-%d'))
+        self.assertEqual(series[-1]['total'], Decimal('120.50'))
+        self.assertEqual(series[-3]['total'], Decimal('30.00'))
+        self.assertEqual(series[0]['total'], 0)
+        self.assertEqual(series[0]['categories'], [])
+
+    def test_month_filter(self):
+        last_year = self.today.replace(year=self.today.year - 1)
+        self.make_transaction(type='IN', amount='10.00', date=last_year)
+        self.make_transaction(type='IN', amount='20.00')
+
+        data = self.get_summary(month=self.today.month, year=self.today.year)
+
+        self.assertEqual(data['total_income'], Decimal('20.00'))
+        self.assertEqual(data['total_expense'], 0)
+
+    def test_invalid_month_is_rejected(self):
+        for params in ({'month': 'abc', 'year': '2024'}, {'month': '1', 'year': 'x'}, {'month': '13', 'year': '2024'}):
+            response = self.client.get('/api/finance/transactions/summary/', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('month', response.data)
+
+    def test_query_count_is_constant_in_number_of_accounts(self):
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.get_summary()
+            return len(ctx.captured_queries)
+
+        account = self.make_account()
+        self.make_transaction(account, 'OUT', '10.00', category=self.food)
+        baseline = count_queries()
+
+        for i in range(10):
+            extra = self.make_account(name=f'Cuenta {i}')
+            self.make_transaction(extra, 'IN', '5.00', category=self.salary)
+            self.make_transaction(extra, 'OUT', '1.00', date=self.today - datetime.timedelta(days=i % 7))
+
+        self.assertEqual(count_queries(), baseline)
+
+
+class SummaryCacheTests(FinanceTestCase):
+    url = '/api/finance/transactions/summary/'
+
+    def test_cached_until_user_writes(self):
+        account = self.make_account()
+        first = self.client.get(self.url)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(cached.data, first.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_transaction(account, 'IN', '10.00')
+
+        fresh = self.client.get(self.url)
+        self.assertNotEqual(fresh['ETag'], etag)
+        self.assertEqual(fresh.data['total_income'], Decimal('10.00'))
+
+    def test_etag_is_per_period(self):
+        all_time = self.client.get(self.url)
+        monthly = self.client.get(self.url, {'month': self.today.month, 'year': self.today.year})
+        self.assertNotEqual(all_time['ETag'], monthly['ETag'])
+
+    def test_if_none_match_returns_not_modified_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_other_users_writes_keep_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        other = User.objects.create_user(username='eve', password='secret-pass-123')
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.create(user=other, name='Banco', type='DEBIT')
+
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+    def test_maintenance_writes_move_the_version(self):
+        account = self.make_account(balance='100.00')
+        self.make_transaction(account, 'IN', '10.00', category=self.salary)
+        # Drift the stored ledger and rollup behind the signals' back
+        Account.objects.filter(pk=account.pk).update(ledger_balance=Decimal('0.00'))
+        MonthlyCategoryRollup.objects.filter(user=self.user).delete()
+        stale = self.client.get(self.url)
+        self.assertEqual(stale.data['accounts'][0]['calculated_balance'], Decimal('100.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ledger.rebuild_balances()
+        repaired = self.client.get(self.url, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertEqual(repaired.status_code, 200)
+        self.assertEqual(repaired.data['accounts'][0]['calculated_balance'], Decimal('110.00'))
+        self.assertEqual(repaired.data['total_income'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rollups.backfill()
+        self.assertEqual(self.client.get(self.url).data['total_income'], Decimal('10.00'))
+
+
+@override_settings(TRANSACTIONS_MAX_PAGE_SIZE=5)
+class PaginationTests(FinanceTestCase):
+    url = '/api/finance/transactions/'
+
+    def test_walks_history_in_order_without_gaps(self):
+        created = [
+            self.make_transaction(date=self.today - datetime.timedelta(days=i // 3)).id
+            for i in range(12)
+        ]
+        expected = list(
+            Transaction.objects.filter(id__in=created).order_by('-date', '-created_at', '-id').values_list('id', flat=True)
+        )
+
+        seen, url, params = [], self.url, {'page_size': 4}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        for _ in range(8):
+            self.make_transaction()
+        response = self.client.get(self.url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_paginated_by_default(self):
+        for _ in range(6):
+            self.make_transaction()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    @skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans are PostgreSQL specific')
+    def test_deep_pages_seek_from_the_cursor(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type='OUT', amount=Decimal('1.00'), payment_method='CASH',
+                        date=datetime.date(2020, 1, 1) + datetime.timedelta(days=i % 1500))
+            for i in range(3000)
+        ])
+        middle = Transaction.objects.filter(user=self.user).order_by('-date', '-created_at', '-id')[1500]
+        cursor = TransactionKeysetPagination().encode_cursor(middle)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {'cursor': cursor})
+        self.assertEqual(len(response.data['results']), 5)
+        page_query = next(query['sql'] for query in ctx.captured_queries if 'LIMIT 6' in query['sql'])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE finance_transaction')
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {page_query}')
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        # The index range starts at the cursor's date instead of the user's newest row
+        scan = plan[plan.index('finance_tx_user_keyset_idx'):]
+        index_cond = next(line for line in scan.splitlines() if 'Index Cond' in line)
+        self.assertIn(f"date <= '{middle.date.isoformat()}'", index_cond)
+
+
+class LedgerTests(FinanceTestCase):
+    def ledger(self, account):
+        account.refresh_from_db()
+        return account.ledger_balance
+
+    def test_create_edit_and_soft_delete(self):
+        bank = self.make_account(balance='100.00')
+        cash = self.make_account(name='Efectivo')
+        tx = self.make_transaction(bank, 'OUT', '40.00')
+        self.assertEqual(self.ledger(bank), Decimal('-40.00'))
+
+        response = self.client.patch(f'/api/finance/transactions/{tx.id}/', {'amount': '25.00', 'type': 'IN'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ledger(bank), Decimal('25.00'))
+
+        response = self.client.patch(f'/api/finance/transactions/{tx.id}/', {'account': cash.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ledger(bank), Decimal('0.00'))
+        self.assertEqual(self.ledger(cash), Decimal('25.00'))
+
+        response = self.client.delete(f'/api/finance/transactions/{tx.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.ledger(cash), Decimal('0.00'))
+
+    def test_saving_a_stale_account_keeps_the_ledger(self):
+        bank = self.make_account(balance='100.00')
+        stale = Account.objects.get(pk=bank.pk)
+        self.make_transaction(bank, 'IN', '100.00')
+
+        stale.name = 'Renombrada'
+        stale.save()
+        response = self.client.patch(f'/api/finance/accounts/{bank.id}/', {'color': '#000000'})
+        self.assertEqual(response.status_code, 200)
+
+        bank.refresh_from_db()
+        self.assertEqual((bank.name, bank.color, bank.ledger_balance), ('Renombrada', '#000000', Decimal('100.00')))
+
+    def test_transfer_and_reconcile(self):
+        bank = self.make_account(balance='100.00')
+        cash = self.make_account(name='Efectivo')
+        response = self.client.post('/api/finance/transactions/transfer/', {
+            'from_account': bank.id, 'to_account': cash.id, 'amount': '30.10',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ledger(bank), Decimal('-30.10'))
+        self.assertEqual(self.ledger(cash), Decimal('30.10'))
+
+        response = self.client.post(f'/api/finance/accounts/{bank.id}/reconcile/', {'actual_balance': '50.00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['previous_balance'], 69.9)
+        bank.refresh_from_db()
+        self.assertEqual(bank.current_balance, Decimal('50.00'))
+
+    def test_other_users_transactions_do_not_count(self):
+        bank = self.make_account()
+        intruder = User.objects.create_user(username='eve', password='secret-pass-123')
+        Transaction.objects.create(user=intruder, account=bank, type='IN', amount=Decimal('10.00'),
+                                   date=self.today, payment_method='CASH')
+        self.assertEqual(self.ledger(bank), Decimal('0.00'))
+
+    def test_rebuild_balances_repairs_drift(self):
+        bank = self.make_account()
+        self.make_transaction(bank, 'IN', '80.00')
+        Account.objects.filter(pk=bank.pk).update(ledger_balance=Decimal('3.00'))
+
+        out = StringIO()
+        call_command('rebuild_balances', '--dry-run', stdout=out)
+        self.assertIn('found 1 with drift', out.getvalue())
+        self.assertEqual(self.ledger(bank), Decimal('3.00'))
+
+        call_command('rebuild_balances', stdout=StringIO())
+        self.assertEqual(self.ledger(bank), Decimal('80.00'))
+
+
+class RollupTests(FinanceTestCase):
+    def buckets(self):
+        return {
+            (row.year, row.month, row.category_id, row.type, row.is_transfer): (row.total, row.count)
+            for row in MonthlyCategoryRollup.objects.filter(user=self.user, count__gt=0)
+        }
+
+    def test_incremental_updates_match_backfill(self):
+        last_year = self.today.replace(year=self.today.year - 1, day=1)
+        tx = self.make_transaction(type='OUT', amount='40.00', category=self.food)
+        self.make_transaction(type='OUT', amount='15.00', category=self.food)
+        self.make_transaction(type='IN', amount='300.00', date=last_year, category=self.salary)
+        moved = self.make_transaction(type='OUT', amount='9.99', is_transfer=True)
+
+        self.client.patch(f'/api/finance/transactions/{tx.id}/', {'amount': '45.00', 'date': str(last_year)})
+        self.client.delete(f'/api/finance/transactions/{moved.id}/')
+
+        incremental = self.buckets()
+        self.assertEqual(incremental[(self.today.year, self.today.month, self.food.id, 'OUT', False)], (Decimal('15.00'), 1))
+        self.assertEqual(incremental[(last_year.year, last_year.month, self.food.id, 'OUT', False)], (Decimal('45.00'), 1))
+        self.assertNotIn((self.today.year, self.today.month, None, 'OUT', True), incremental)
+
+        call_command('backfill_rollups', stdout=StringIO())
+        self.assertEqual(self.buckets(), incremental)
+
+    def test_deleted_category_folds_into_uncategorized(self):
+        self.make_transaction(type='OUT', amount='5.00')
+        self.make_transaction(type='OUT', amount='7.00', category=self.food)
+        self.food.delete()
+
+        key = (self.today.year, self.today.month, None, 'OUT', False)
+        self.assertEqual(self.buckets(), {key: (Decimal('12.00'), 2)})
+
+    def test_concurrent_first_write_adds_to_the_winning_row(self):
+        real_first = QuerySet.first
+
+        for category_id in (self.food.id, None):
+            MonthlyCategoryRollup.objects.create(user=self.user, year=2024, month=1, category_id=category_id, type='OUT',
+                                                 total=Decimal('5.00'), count=1)
+            lookups = []
+
+            def stale_first(queryset):
+                # The first lookup ran before the concurrent insert of the bucket committed
+                lookups.append(queryset)
+                return None if len(lookups) == 1 else real_first(queryset)
+
+            with mock.patch.object(QuerySet, 'first', autospec=True, side_effect=stale_first):
+                rollups.add_to_bucket((self.user.id, 2024, 1, category_id, 'OUT', False), Decimal('7.00'), 1)
+            self.assertEqual(self.buckets()[(2024, 1, category_id, 'OUT', False)], (Decimal('12.00'), 2))
+
+    def test_deleting_user_leaves_no_rollups(self):
+        self.make_transaction(type='OUT', amount='7.00', category=self.food)
+        user_id = self.user.id
+        self.user.delete()
+
+        # Cascaded transaction/category deletes must not recreate buckets for the deleted user
+        self.assertFalse(MonthlyCategoryRollup.objects.filter(user_id=user_id).exists())
+
+    def test_monthly_summary_reads_rollup(self):
+        self.make_transaction(type='OUT', amount='20.00', category=self.food)
+        # Raw rows written without signals are invisible to the rollup-backed totals
+        Transaction.objects.bulk_create([Transaction(
+            user=self.user, type='OUT', amount=Decimal('99.00'), date=self.today, payment_method='CASH',
+        )])
+
+        response = self.client.get('/api/finance/transactions/summary/', {'month': self.today.month, 'year': self.today.year})
+
+        self.assertEqual(response.data['total_expense'], Decimal('20.00'))
+        self.assertEqual(response.data['expenses_by_category'][0]['category__name'], 'Comida')
+
+
+class StatementImportTests(FinanceTestCase):
+    CSV = (
+        'date,amount,description,category\n'
+        '2024-01-05,-120.50,Super,comida\n'
+        '06/01/2024,"1,000.00",Nomina,Sueldo\n'
+        'yesterday,10,Bad date,\n'
+        '2024-01-07,abc,Bad amount,\n'
+        '2024-01-08,-30,Taxi,\n'
+    )
+    OFX = (
+        'OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+        '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240210120000[-6:CST]<TRNAMT>-45.00<FITID>1<NAME>Uber<MEMO>Viaje</STMTTRN>\n'
+        '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240211<TRNAMT>200.00<FITID>2<NAME>Transferencia</STMTTRN>\n'
+        '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>2024XX11<TRNAMT>-1.00<FITID>3<NAME>Broken</STMTTRN>\n'
+        '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+    )
+
+    def test_csv_upload_reports_row_errors(self):
+        account = self.make_account()
+        upload = SimpleUploadedFile('enero.csv', self.CSV.encode())
+
+        response = self.client.post('/api/finance/transactions/import/', {
+            'file': upload, 'account': account.id, 'batch_size': 2,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([error['row'] for error in response.data['errors']], [4, 5])
+
+        imported = Transaction.objects.filter(account=account)
+        self.assertEqual(imported.get(description='Super').category, self.food)
+        self.assertEqual(imported.get(description='Nomina').date, datetime.date(2024, 1, 6))
+        self.assertEqual(imported.get(description='Nomina').type, 'IN')
+
+        account.refresh_from_db()
+        self.assertEqual(account.ledger_balance, Decimal('849.50'))
+        rollup = MonthlyCategoryRollup.objects.get(user=self.user, year=2024, month=1, category=self.food)
+        self.assertEqual((rollup.total, rollup.count), (Decimal('120.50'), 1))
+
+    def test_ofx_command(self):
+        account = self.make_account()
+        with tempfile.NamedTemporaryFile('w', suffix='.ofx', delete=False) as statement:
+            statement.write(self.OFX)
+        self.addCleanup(os.remove, statement.name)
+
+        out = StringIO()
+        call_command('import_statement', statement.name, user='ana', account=account.id, stdout=out)
+
+        self.assertIn('"created": 2', out.getvalue())
+        uber = Transaction.objects.get(account=account, type='OUT')
+        self.assertEqual((uber.amount, uber.date, uber.description), (Decimal('45.00'), datetime.date(2024, 2, 10), 'Uber - Viaje'))
+        self.assertEqual(uber.payment_method, 'CARD')
+
+    def test_ofx_parser_handles_tokens_split_across_chunks(self):
+        rows = list(importers.iter_ofx(StringIO(self.OFX)))
+        original = importers.OFX_CHUNK_SIZE
+        importers.OFX_CHUNK_SIZE = 7
+        try:
+            self.assertEqual(list(importers.iter_ofx(StringIO(self.OFX))), rows)
+        finally:
+            importers.OFX_CHUNK_SIZE = original
+        self.assertEqual(len(rows), 3)
+
+    def test_foreign_account_is_rejected(self):
+        other = User.objects.create_user(username='eve', password='secret-pass-123')
+        account = Account.objects.create(user=other, name='Banco', type='DEBIT')
+        upload = SimpleUploadedFile('enero.csv', self.CSV.encode())
+
+        response = self.client.post('/api/finance/transactions/import/', {'file': upload, 'account': account.id}, format='multipart')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportTests(FinanceTestCase):
+    url = '/api/finance/transactions/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.account = self.make_account()
+        self.make_transaction(self.account, 'OUT', '12.50', date=datetime.date(2024, 3, 1), category=self.food, description='Tacos, "al pastor"')
+        self.make_transaction(None, 'IN', '100.00', date=datetime.date(2024, 4, 1))
+        self.make_transaction(self.account, 'OUT', '1.00', date=datetime.date(2024, 3, 2), is_deleted=True)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual([row['amount'] for row in rows], ['100.00', '12.50'])
+        self.assertEqual(rows[1]['category'], 'Comida')
+        self.assertEqual(rows[1]['account'], 'Banco')
+        self.assertEqual(rows[1]['description'], 'Tacos, "al pastor"')
+
+    def test_ndjson_with_date_range(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'output': 'ndjson', 'date_from': '2024-03-01', 'date_to': '2024-03-31'})
+            lines = self.read(response).splitlines()
+
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row['date'], row['amount'], row['category'], row['is_transfer']), ('2024-03-01', '12.50', 'Comida', False))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'date_from': 'ayer'}).status_code, 400)
+
+
+class ReadPathTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        account = self.make_account()
+        self.make_transaction(account, 'OUT', '12.5', category=self.food, description='Café "doble"\u2028', subcategory='Desayuno')
+        self.make_transaction(None, 'IN', '3000.00', date=datetime.date(2023, 12, 31))
+        self.make_transaction(account, 'OUT', '7.00', is_transfer=True)
+
+    def serializer_bytes(self, data):
+        return JSONRenderer().render(data)
+
+    def test_list_is_byte_identical_to_serializer(self):
+        expected = self.serializer_bytes({'next': None, 'results': TransactionSerializer(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-created_at', '-id'), many=True,
+        ).data})
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/finance/transactions/')
+
+        self.assertEqual(response.content, expected)
+
+    def test_retrieve_is_byte_identical_to_serializer(self):
+        for tx in Transaction.objects.filter(user=self.user):
+            response = self.client.get(f'/api/finance/transactions/{tx.id}/')
+            self.assertEqual(response.content, self.serializer_bytes(TransactionSerializer(tx).data))
+
+    def test_retrieve_missing(self):
+        self.assertEqual(self.client.get('/api/finance/transactions/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/finance/transactions/abc/').status_code, 404)
+
+
+class FilterTests(FinanceTestCase):
+    url = '/api/finance/transactions/'
+
+    def setUp(self):
+        super().setUp()
+        self.bank = self.make_account()
+        self.jan = self.make_transaction(self.bank, 'OUT', '50.00', date=datetime.date(2024, 1, 31), category=self.food, payment_method='CARD')
+        self.feb = self.make_transaction(self.bank, 'IN', '900.00', date=datetime.date(2024, 2, 1), category=self.salary)
+        self.moved = self.make_transaction(None, 'OUT', '20.00', date=datetime.date(2024, 2, 15), is_transfer=True)
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id'] for row in response.data['results']}
+
+    def test_filters(self):
+        self.assertEqual(self.ids(month=1, year=2024), {self.jan.id})
+        self.assertEqual(self.ids(date_from='2024-02-01'), {self.feb.id, self.moved.id})
+        self.assertEqual(self.ids(date_from='2024-01-15', date_to='2024-02-01'), {self.jan.id, self.feb.id})
+        self.assertEqual(self.ids(category=self.food.id), {self.jan.id})
+        self.assertEqual(self.ids(category='none'), {self.moved.id})
+        self.assertEqual(self.ids(account=self.bank.id, type='in'), {self.feb.id})
+        self.assertEqual(self.ids(payment_method='CARD'), {self.jan.id})
+        self.assertEqual(self.ids(is_transfer='true'), {self.moved.id})
+        self.assertEqual(self.ids(amount_min='20', amount_max='50'), {self.jan.id, self.moved.id})
+
+    def test_invalid_values_are_rejected(self):
+        for params in ({'date_from': '31/01/2024'}, {'type': 'X'}, {'amount_min': 'mucho'}, {'month': 13, 'year': 2024}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    @skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans are PostgreSQL specific')
+    def test_filters_use_partial_indexes(self):
+        def plan(**params):
+            request = Request(APIRequestFactory().get(self.url, params))
+            queryset = Transaction.objects.filter(user=self.user, is_deleted=False).order_by('-date', '-created_at', '-id')
+            return TransactionFilterBackend().filter_queryset(request, queryset, None).explain()
+
+        # A realistic history and fresh statistics, so the plans do not depend on what earlier tests left behind
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type='OUT', amount=Decimal('1.00'), payment_method='CASH',
+                        date=datetime.date(2020, 1, 1) + datetime.timedelta(days=i % 1500),
+                        category=self.food if i % 3 else None, account=self.bank if i % 2 else None)
+            for i in range(3000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE finance_transaction')
+            cursor.execute('SET enable_seqscan = off')
+        try:
+            self.assertNotIn('Seq Scan', plan(date_from='2024-01-01', date_to='2024-12-31'))
+            self.assertIn('finance_tx_user_cat_date_idx', plan(category=self.food.id, date_from='2024-01-01'))
+            self.assertIn('finance_tx_user_acc_date_idx', plan(account=self.bank.id, date_from='2024-01-01'))
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+
+
+class SearchTests(FinanceTestCase):
+    url = '/api/finance/transactions/'
+
+    def setUp(self):
+        super().setUp()
+        self.uber = self.make_transaction(description='Viaje Uber al aeropuerto', date=datetime.date(2024, 1, 1))
+        self.eats = self.make_transaction(description='Uber', subcategory='Comida a domicilio', date=datetime.date(2024, 1, 2))
+        self.transfer = self.make_transaction(description='Transferencia a Ahorro', is_transfer=True)
+        self.other = self.make_transaction(description='Renta', subcategory='Casa')
+
+    def search(self, term, **params):
+        response = self.client.get(self.url, {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_matches_description_and_subcategory(self):
+        self.assertEqual(set(self.search('uber')), {self.uber.id, self.eats.id})
+        self.assertEqual(self.search('Transferencia a'), [self.transfer.id])
+        self.assertEqual(self.search('domicilio'), [self.eats.id])
+        self.assertEqual(self.search('uber', date_from='2024-01-02'), [self.eats.id])
+
+    def test_search_is_not_paginated(self):
+        response = self.client.get(self.url, {'search': 'uber', 'page_size': 1})
+        self.assertIsInstance(response.data, list)
+
+    @skipUnless(connection.vendor == 'postgresql', 'pg_trgm ranking is PostgreSQL specific')
+    def test_ranked_by_similarity(self):
+        # The exact match ranks first even though it is not the most recent
+        self.make_transaction(description='Suburbano', date=datetime.date(2025, 1, 1))
+        self.assertEqual(self.search('Uber')[:2], [self.eats.id, self.uber.id])
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.text = ''
+
+
+class RecurringExpenseTests(FinanceTestCase):
+    def test_next_due_date(self):
+        today = datetime.date(2024, 2, 20)
+        self.assertEqual(recurring.next_due_date(31, None, today), datetime.date(2024, 2, 29))
+        self.assertEqual(recurring.next_due_date(5, datetime.date(2024, 2, 3), today), datetime.date(2024, 3, 5))
+        self.assertEqual(recurring.next_due_date(31, datetime.date(2024, 12, 31), today), datetime.date(2025, 1, 31))
+        # A payment from months ago does not leave the expense overdue in the past
+        self.assertEqual(recurring.next_due_date(10, datetime.date(2023, 11, 10), today), datetime.date(2024, 2, 10))
+
+    def test_pay_advances_due_date(self):
+        account = self.make_account()
+        expense = RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('800.00'), due_day=5, account=account)
+        paid_on = self.today.replace(day=1)
+
+        response = self.client.post(f'/api/finance/recurring/{expense.id}/pay/', {'date': paid_on.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        expense.refresh_from_db()
+        self.assertEqual(expense.last_paid_date, paid_on)
+        self.assertEqual(expense.next_due_date, recurring.next_due_date(5, paid_on))
+        self.assertGreater(expense.next_due_date, self.today.replace(day=28))
+        self.assertEqual(Transaction.objects.get().date, paid_on)
+
+    def test_pay_rejects_invalid_date(self):
+        expense = RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('800.00'), due_day=5)
+
+        response = self.client.post(f'/api/finance/recurring/{expense.id}/pay/', {'date': 'ayer'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rollover_moves_only_stale_expenses(self):
+        january = RecurringExpense.objects.create(user=self.user, name='Luz', amount=Decimal('100.00'), due_day=31)
+        march = RecurringExpense.objects.create(user=self.user, name='Agua', amount=Decimal('50.00'), due_day=10,
+                                                last_paid_date=datetime.date(2024, 2, 10))
+        recurring.reschedule(RecurringExpense.objects.all(), datetime.date(2024, 1, 15))
+
+        out = StringIO()
+        call_command('rollover_recurring_expenses', '--date', '2024-02-20', stdout=out)
+
+        self.assertIn('Updated the due date of 1 ', out.getvalue())
+        january.refresh_from_db()
+        march.refresh_from_db()
+        self.assertEqual(january.next_due_date, datetime.date(2024, 2, 29))
+        self.assertEqual(march.next_due_date, datetime.date(2024, 3, 10))
+
+    def test_summary_sums_unpaid_in_one_query(self):
+        for day in (1, 15, 28):
+            RecurringExpense.objects.create(user=self.user, name=f'Gasto {day}', amount=Decimal('10.00'), due_day=day)
+        RecurringExpense.objects.create(user=self.user, name='Inactivo', amount=Decimal('99.00'), due_day=1, is_active=False)
+        paid = RecurringExpense.objects.create(user=self.user, name='Pagado', amount=Decimal('99.00'), due_day=1,
+                                               last_paid_date=self.today)
+        other = User.objects.create_user(username='otro')
+        RecurringExpense.objects.create(user=other, name='Ajeno', amount=Decimal('99.00'), due_day=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/finance/transactions/summary/')
+
+        self.assertEqual(response.data['upcoming_fixed_expenses'], Decimal('30.00'))
+        recurring_queries = [q['sql'] for q in ctx.captured_queries if 'finance_recurringexpense' in q['sql']]
+        self.assertEqual(len(recurring_queries), 1)
+        self.assertIn('SUM', recurring_queries[0])
+        self.assertGreater(paid.next_due_date, self.today)
+
+
+class NotificationTestCase(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = datetime.date(2024, 2, 20)
+        self.user.whatsapp_enabled = True
+        self.user.whatsapp_phone = '+5215500000000'
+        self.user.whatsapp_apikey = 'key'
+        self.user.save()
+        RecurringExpense.objects.create(user=self.user, name='Internet', amount=Decimal('500.00'), due_day=27)
+        # Clamped to Feb 29 (9 days away): no reminder
+        RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('800.00'), due_day=31)
+        RecurringExpense.objects.create(user=self.user, name='Gym', amount=Decimal('300.00'), due_day=23,
+                                        last_paid_date=datetime.date(2024, 2, 1))
+        self.schedule()
+
+    def schedule(self):
+        # Saving schedules against the real date; pin the fixtures to self.today
+        recurring.reschedule(RecurringExpense.objects.all(), self.today)
+
+
+class NotificationTests(NotificationTestCase):
+    def test_candidates_for_all_users_in_one_query(self):
+        for i in range(3):
+            user = User.objects.create_user(username=f'user{i}', whatsapp_enabled=True, whatsapp_phone='1', whatsapp_apikey='k')
+            RecurringExpense.objects.create(user=user, name='Luz', amount=Decimal('100.00'), due_day=23)
+        disabled = User.objects.create_user(username='off', whatsapp_enabled=False, whatsapp_phone='1', whatsapp_apikey='k')
+        RecurringExpense.objects.create(user=disabled, name='Luz', amount=Decimal('100.00'), due_day=23)
+        self.schedule()
+
+        with self.assertNumQueries(1):
+            reminders = list(notifications.due_reminders(self.today))
+
+        self.assertEqual(
+            sorted((r.user.username, r.expense.name, r.days_until) for r in reminders),
+            [('ana', 'Internet', 7), ('user0', 'Luz', 3), ('user1', 'Luz', 3), ('user2', 'Luz', 3)],
+        )
+
+    def test_delivery_reports_outcomes_and_stats(self):
+        session = mock.Mock()
+        session.get.side_effect = [FakeResponse(200), FakeResponse(500)]
+        reminders = list(notifications.due_reminders(self.today)) * 2
+        sender = notifications.WhatsAppSender(workers=2, session=session)
+
+        deliveries = notifications.deliver(reminders, sender, workers=2)
+        stats = notifications.delivery_stats(deliveries, elapsed=0.5)
+
+        self.assertEqual(sorted(d.status for d in deliveries), ['ERROR 500', 'OK'])
+        self.assertEqual((stats['sent'], stats['failed'], stats['throughput_per_s']), (1, 1, 4.0))
+        params = session.get.call_args.kwargs['params']
+        self.assertEqual(params['phone'], '5215500000000')
+        self.assertIn('_Internet_ se cobra en 7 días', params['text'])
+
+    def test_rate_limiter_spaces_requests_per_host(self):
+        limiter = notifications.HostRateLimiter(rate=50)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.wait('https://api.callmebot.com/whatsapp.php')
+        limiter.wait('https://example.com/')
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50)
+
+    def test_command(self):
+        with mock.patch('requests.Session.get', return_value=FakeResponse(200)), \
+                mock.patch('finance.management.commands.send_whatsapp_notifications.datetime') as dt:
+            dt.date.today.return_value = self.today
+            out = StringIO()
+            call_command('send_whatsapp_notifications', stdout=out)
+
+        self.assertIn('[OK] ana → Internet (en 7 días)', out.getvalue())
+        self.assertIn('"sent": 1', out.getvalue())
+
+
+class OutboxTests(NotificationTestCase):
+    def sender(self, *responses):
+        session = mock.Mock()
+        session.get.side_effect = list(responses)
+        return notifications.WhatsAppSender(workers=2, session=session)
+
+    def test_scan_is_idempotent(self):
+        self.assertEqual(outbox.enqueue_due_reminders(self.today), 1)
+        self.assertEqual(outbox.enqueue_due_reminders(self.today), 0)
+
+        row = NotificationOutbox.objects.get()
+        self.assertEqual((row.due_date, row.days_before, row.status), (datetime.date(2024, 2, 27), 7, 'PENDING'))
+
+    def test_drain_records_delivery(self):
+        outbox.enqueue_due_reminders(self.today)
+
+        deliveries = outbox.drain(self.sender(FakeResponse(200)))
+
+        self.assertEqual(len(deliveries), 1)
+        row = NotificationOutbox.objects.get()
+        self.assertEqual((row.status, row.attempts), ('SENT', 1))
+        self.assertIsNotNone(row.sent_at)
+        # Sent rows are never picked up again
+        self.assertEqual(outbox.drain(self.sender()), [])
+
+    def test_failures_back_off_then_give_up(self):
+        outbox.enqueue_due_reminders(self.today)
+
+        outbox.drain(self.sender(FakeResponse(500)), max_attempts=2)
+        row = NotificationOutbox.objects.get()
+        self.assertEqual((row.status, row.attempts), ('PENDING', 1))
+        self.assertGreater(row.next_attempt_at, timezone.now())
+
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+        outbox.drain(self.sender(FakeResponse(500)), max_attempts=2)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts, row.last_error), ('FAILED', 2, 'ERROR 500'))
+
+    def test_claimed_rows_are_leased(self):
+        outbox.enqueue_due_reminders(self.today)
+
+        self.assertEqual(len(outbox.claim(10)), 1)
+        self.assertEqual(outbox.claim(10), [])
+
+        # A worker that crashed mid-send releases its rows when the lease expires
+        NotificationOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(len(outbox.claim(10)), 1)
+
+    def test_retry_delay(self):
+        self.assertEqual(outbox.retry_delay(1), datetime.timedelta(minutes=1))
+        self.assertEqual(outbox.retry_delay(4), datetime.timedelta(minutes=8))
+        self.assertEqual(outbox.retry_delay(20), outbox.RETRY_MAX)
+
+
+class BenchmarkTests(FinanceTestCase):
+    def test_seed_is_deterministic_and_consistent(self):
+        today = datetime.date(2024, 2, 20)
+        users = benchmarks.seed(users=2, transactions=150, seed=7, prefix='a', today=today)
+        again = benchmarks.seed(users=2, transactions=150, seed=7, prefix='b', today=today)
+
+        self.assertEqual(Transaction.all_objects.filter(user__in=users).count(), 300)
+        self.assertEqual(RecurringExpense.objects.filter(user=users[0], next_due_date__isnull=False).count(), 6)
+        fields = ('type', 'amount', 'date', 'description', 'is_deleted')
+        self.assertEqual(
+            list(Transaction.all_objects.filter(user=users[0]).order_by('id').values_list(*fields)),
+            list(Transaction.all_objects.filter(user=again[0]).order_by('id').values_list(*fields)),
+        )
+        # Bulk inserted rows still went through the ledger
+        self.assertEqual(ledger.rebuild_balances(Account.objects.filter(user__in=users), repair=False), [])
+        # Nothing seeded gets real reminders unless asked for
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in users], whatsapp_enabled=True).exists())
+        self.assertTrue(all(user.whatsapp_enabled for user in benchmarks.seed(users=1, transactions=0, prefix='c', whatsapp=True)))
+
+    def test_run_benchmarks_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.json')
+            call_command('run_benchmarks', '--sizes', '20,40', '--repeat', '1', '--users', '1',
+                         '--scenario', 'summary', '--scenario', 'transfer', '--output', path, stdout=StringIO())
+            out = StringIO()
+            call_command('run_benchmarks', '--sizes', '20', '--repeat', '1', '--users', '1',
+                         '--scenario', 'summary', '--compare', path, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['meta']['database'], connection.vendor)
+        summary = report['results']['20']['scenarios']['summary']
+        self.assertEqual(summary['status'], 200)
+        self.assertGreater(summary['queries'], 0)
+        self.assertEqual(set(report['comparison']['20']), {'summary'})
+        # Everything seeded for the run is rolled back
+        self.assertFalse(User.objects.filter(username__startswith='bench-run-').exists())
+
+
+class RequestMetricsTests(FinanceTestCase):
+    url = '/api/finance/transactions/summary/'
+
+    def test_server_timing_header_counts_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        timing = response['Server-Timing']
+        self.assertIn(f'db;desc="{len(ctx.captured_queries)} queries";dur=', timing)
+        self.assertIn('db-slowest;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    @override_settings(DEBUG=False)
+    def test_logs_json_over_threshold(self):
+        with override_settings(REQUEST_METRICS_MAX_QUERIES=1):
+            with self.assertLogs('request_metrics', 'WARNING') as logs:
+                self.client.get(self.url)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['route'], 'api/finance/transactions/summary/$')
+        self.assertEqual((record['status'], record['user_id']), (200, self.user.id))
+        self.assertGreaterEqual(record['db_queries'], 1)
+        self.assertIn('SELECT', record['slowest_query'])
+
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('request_metrics'):
+            self.client.get(self.url)
+
+
+class PrometheusMetricsTests(FinanceTestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_labeled_by_route_and_action(self):
+        labels = {'route': 'transaction-summary', 'method': 'GET'}
+        before = self.sample('finance_http_request_duration_seconds_count', **labels)
+
+        self.client.get('/api/finance/transactions/summary/')
+
+        self.assertEqual(self.sample('finance_http_request_duration_seconds_count', **labels), before + 1)
+        self.assertGreater(self.sample('finance_http_request_db_queries_sum', **labels), 0)
+
+    def test_summary_cache_hits_and_misses(self):
+        miss = self.sample('finance_cache_requests_total', cache='summary', result='miss')
+        hit = self.sample('finance_cache_requests_total', cache='summary', result='hit')
+
+        self.client.get('/api/finance/transactions/summary/')
+        self.client.get('/api/finance/transactions/summary/')
+
+        self.assertEqual(self.sample('finance_cache_requests_total', cache='summary', result='miss'), miss + 1)
+        self.assertEqual(self.sample('finance_cache_requests_total', cache='summary', result='hit'), hit + 1)
+
+    def test_endpoint_exposes_outbox_and_request_metrics(self):
+        self.client.get('/api/finance/accounts/')
+        expense = RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('800.00'), due_day=5)
+        NotificationOutbox.objects.create(user=self.user, expense=expense, due_date=self.today, days_before=3,
+                                          message='x', status='FAILED', next_attempt_at=timezone.now())
+
+        response = self.client.get('/metrics')
+
+        body = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('finance_notification_outbox{status="failed"} 1.0', body)
+        self.assertIn('finance_notification_outbox{status="sent"} 0.0', body)
+        self.assertIn('finance_http_requests_total{method="GET",route="account-list",status="200"}', body)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_endpoint_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AsyncSummaryTests(FinanceFixtures, TransactionTestCase):
+    # Committed data: the aggregates run on other threads' connections
+    databases = '__all__'
+    url = '/api/finance/transactions/summary/async/'
+
+    @classmethod
+    def tearDownClass(cls):
+        # The pool threads hold their own connections to the test database
+        summary.shutdown_fanout()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        account = self.make_account(balance='100.00')
+        self.make_transaction(account, 'IN', '500.00', category=self.salary)
+        self.make_transaction(account, 'OUT', '120.50', category=self.food)
+        self.make_transaction(account, 'OUT', '30.00', date=self.today - datetime.timedelta(days=2))
+        RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('800.00'), due_day=5)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def test_same_payload_and_etag_as_sync_view(self):
+        params = {'month': self.today.month, 'year': self.today.year}
+        response = Client().get(self.url, params, **self.auth)
+        sync = self.client.get('/api/finance/transactions/summary/', params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, JSONRenderer().render(summary.build_summary(self.user, **params)))
+        self.assertEqual(response['ETag'], sync['ETag'])
+        # The fanned-out queries are counted by the metrics middleware too
+        self.assertIn('db;desc="5 queries"', response['Server-Timing'])
+
+    def test_builders_agree(self):
+        self.assertEqual(async_to_sync(summary.abuild_summary)(self.user), summary.build_summary(self.user))
+
+    async def test_under_asgi(self):
+        client = AsyncClient()
+        headers = {'Authorization': self.auth['HTTP_AUTHORIZATION']}
+        response = await client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['total_income'], 500.0)
+
+        not_modified = await client.get(self.url, headers={**headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    @skipIf(connection.vendor == 'sqlite', 'the in-memory test database is never closed')
+    def test_pool_threads_release_their_connections(self):
+        # CONN_MAX_AGE is 0 here, so nothing stays open once the aggregate is done
+        held = []
+
+        def run():
+            summary._in_worker_thread(summary.account_balances, self.user)
+            held.append(connections['default'].connection)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        self.assertEqual(held, [None])
+
+    def test_invalid_month_is_rejected(self):
+        response = Client().get(self.url, {'month': 'abc', 'year': '2024'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('month', json.loads(response.content))
+
+    def test_requires_token(self):
+        self.assertEqual(Client().get(self.url).status_code, 401)
+        self.assertEqual(Client().get(self.url, HTTP_AUTHORIZATION='Bearer nope').status_code, 401)
+
+
+@mock.patch('config.routers.replica_configured', return_value=True)
+class ReplicaRouterTests(FinanceTestCase):
+    router = routers.PrimaryReplicaRouter()
+
+    def test_reads_in_scope_go_to_replica(self, configured):
+        self.assertIsNone(self.router.db_for_read(Transaction))
+        with routers.read_from_replica(self.user.id) as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertEqual(self.router.db_for_read(Transaction), 'replica')
+            self.assertEqual(self.router.db_for_write(Transaction), 'default')
+        self.assertIsNone(self.router.db_for_read(Transaction))
+
+    def test_user_sticks_to_primary_after_a_write(self, configured):
+        account = self.make_account(balance='100.00')
+        other = self.make_account(name='Ahorro')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/finance/transactions/transfer/', {
+                'from_account': account.id, 'to_account': other.id, 'amount': '10.00',
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        with routers.read_from_replica(self.user.id) as alias:
+            self.assertEqual(alias, 'default')
+        # Other users are unaffected
+        eve = User.objects.create_user(username='eve', password='secret-pass-123')
+        self.assertEqual(routers.read_alias_for(eve.id), 'replica')
+
+        cache.delete(routers.STICKY_KEY.format(user_id=self.user.id))
+        self.assertEqual(routers.read_alias_for(self.user.id), 'replica')
+
+    def test_replica_is_never_migrated(self, configured):
+        self.assertFalse(self.router.allow_migrate('replica', 'finance'))
+        self.assertTrue(self.router.allow_migrate('default', 'finance'))
+
+
+class ReplicaFallbackTests(FinanceTestCase):
+    # REPLICA_READS is off in FinanceTestCase, the same as when no replica is configured
+    def test_without_replica_everything_uses_primary(self):
+        routers.stick_to_primary(self.user.id)
+        self.assertIsNone(cache.get(routers.STICKY_KEY.format(user_id=self.user.id)))
+        with routers.read_from_replica(self.user.id) as alias:
+            self.assertEqual(alias, 'default')
+
+
+@skipUnless('replica' in settings.DATABASES, 'set DB_REPLICA_NAME (or DB_REPLICA_HOST) to configure a replica')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ReplicaRoutingTests(FinanceFixtures, TransactionTestCase):
+    # Committed data: the test replica mirrors the primary's database on a connection
+    # of its own, so which connection runs the queries shows the routing
+    databases = '__all__'
+
+    def setUp(self):
+        super().setUp()
+        self.make_transaction(self.make_account(), 'IN', '50.00', category=self.salary)
+        # The fixtures were written by this user
+        cache.clear()
+
+    def replica_queries(self, url, **params):
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_reporting_endpoints_read_from_replica(self):
+        self.assertGreater(self.replica_queries('/api/finance/transactions/summary/'), 0)
+        self.assertGreater(self.replica_queries('/api/finance/transactions/'), 0)
+        self.assertGreater(self.replica_queries('/api/finance/transactions/export/', output='csv'), 0)
+        self.assertEqual(self.replica_queries('/api/finance/accounts/'), 0)
+
+    def test_own_writes_read_from_primary(self):
+        account = self.make_account(balance='100.00')
+        cache.clear()
+        response = self.client.post(f'/api/finance/accounts/{account.id}/reconcile/', {'actual_balance': '80.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.replica_queries('/api/finance/transactions/summary/'), 0)
+        self.assertEqual(self.replica_queries('/api/finance/transactions/'), 0)
+
+    @override_settings(REPLICA_STICKY_SECONDS=7)
+    def test_replica_built_summary_expires_with_the_sticky_window(self):
+        # A replica lagging past the window could have built it from data before the version it is keyed under
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.replica_queries('/api/finance/transactions/summary/')
+        cache_set.assert_called_with(mock.ANY, mock.ANY, 7)
+
+        routers.stick_to_primary(self.user.id)
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.replica_queries('/api/finance/transactions/summary/', month=self.today.month, year=self.today.year)
+        cache_set.assert_called_with(mock.ANY, mock.ANY, SUMMARY_TIMEOUT)
+
+
+class PartitioningTests(FinanceTestCase):
+    @skipIf(connection.vendor == 'postgresql', 'covered by the PostgreSQL tests')
+    def test_plain_table_elsewhere(self):
+        out = StringIO()
+        call_command('partition_transactions', '--convert', stdout=out)
+        self.assertIn('stays a plain table', out.getvalue())
+
+    @skipUnless(connection.vendor == 'postgresql', 'declarative partitioning is PostgreSQL specific')
+    def test_convert_create_and_detach(self):
+        account = self.make_account(balance='100.00')
+        may = datetime.date(2023, 5, 10)
+        old = self.make_transaction(account, 'OUT', '10.00', date=may)
+        recent = self.make_transaction(account, 'IN', '50.00')
+
+        call_command('partition_transactions', '--convert', '--granularity', 'month', stdout=StringIO())
+        with connection.cursor() as cursor:
+            self.assertTrue(partitioning.is_partitioned(cursor))
+            names = [name for name, _, _ in partitioning.partitions(cursor)]
+        self.assertEqual(names[0], 'finance_transaction_m202305')
+        # Two months ahead by default
+        ahead = partitioning.next_period(partitioning.next_period(self.today.replace(day=1), 'month'), 'month')
+        self.assertEqual(names[-1], partitioning.partition_name(ahead, 'month'))
+        self.assertEqual(set(Transaction.objects.values_list('id', flat=True)), {old.id, recent.id})
+
+        # Same sequence, same bookkeeping
+        added = self.make_transaction(account, 'OUT', '5.00', date=may.replace(day=20))
+        self.assertGreater(added.id, recent.id)
+        account.refresh_from_db()
+        self.assertEqual(account.current_balance, Decimal('135.00'))
+
+        # Date range filters only touch their partitions
+        plan = Transaction.objects.filter(user=self.user, date__gte=may.replace(day=1), date__lte=may.replace(day=31)).explain()
+        self.assertIn('finance_transaction_m202305', plan)
+        self.assertNotIn('finance_transaction_default', plan)
+        self.assertNotIn(partitioning.partition_name(self.today, 'month'), plan)
+        response = self.client.get('/api/finance/transactions/', {'date_from': '2023-05-01', 'date_to': '2023-05-31'})
+        self.assertEqual({row['id'] for row in response.data['results']}, {old.id, added.id})
+
+        # Rows past the last partition wait in the default one until theirs is created
+        future = self.today.replace(day=1, year=self.today.year + 3)
+        later = self.make_transaction(account, 'OUT', '1.00', date=future)
+        call_command('partition_transactions', '--date', future.isoformat(), '--ahead', '0', stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {partitioning.DEFAULT_PARTITION}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT id FROM {partitioning.partition_name(future, "month")}')
+            self.assertEqual(cursor.fetchall(), [(later.id,)])
+
+        snapshots.take_snapshots(self.today, since=datetime.date(2023, 5, 1))
+        version = get_data_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('partition_transactions', '--detach-before', '2023-06-01', stdout=StringIO())
+        self.assertNotEqual(get_data_version(self.user.id), version)
+        self.assertFalse(Transaction.objects.filter(pk=old.id).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {partitioning.ARCHIVE_PREFIX}m202305')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+        # The archived rows live on in the opening balance, so nothing downstream moves
+        account.refresh_from_db()
+        self.assertEqual(account.balance, Decimal('85.00'))
+        self.assertEqual(account.current_balance, Decimal('134.00'))
+        self.assertEqual(ledger.rebuild_balances(Account.objects.filter(pk=account.pk), repair=False), [])
+        self.assertFalse(account.balance_snapshots.filter(date__lt=datetime.date(2023, 6, 1)).exists())
+        self.assertEqual(snapshots.balance_as_of(account, self.today)[0], Decimal('135.00'))
+        self.assertEqual(snapshots.balance_as_of(account, datetime.date(2023, 6, 1))[0], Decimal('85.00'))
+        call_command('backfill_rollups', stdout=StringIO())
+        may_rollup = MonthlyCategoryRollup.objects.get(user=self.user, year=2023, month=5, type='OUT')
+        self.assertEqual((may_rollup.total, may_rollup.count), (Decimal('15.00'), 2))
+
+
+class SoftDeleteTests(FinanceTestCase):
+    def test_default_manager_hides_deleted_rows(self):
+        account = self.make_account(balance='100.00')
+        kept = self.make_transaction(account, 'OUT', '10.00')
+        gone = self.make_transaction(account, 'OUT', '20.00')
+
+        response = self.client.delete(f'/api/finance/transactions/{gone.id}/')
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(list(Transaction.objects.all()), [kept])
+        gone = Transaction.all_objects.get(pk=gone.id)
+        self.assertTrue(gone.is_deleted)
+        self.assertIsNotNone(gone.deleted_at)
+        self.assertEqual(self.client.get(f'/api/finance/transactions/{gone.id}/').status_code, 404)
+
+        # Restoring counts the row again
+        gone.is_deleted = False
+        gone.save()
+        self.assertIsNone(gone.deleted_at)
+        account.refresh_from_db()
+        self.assertEqual(account.current_balance, Decimal('70.00'))
+
+    def test_compaction_archives_rows_past_retention(self):
+        account = self.make_account(balance='100.00')
+        live = self.make_transaction(account, 'OUT', '10.00', description='café')
+        old = [self.make_transaction(account, 'OUT', '5.00', is_deleted=True, description=f'old {i}') for i in range(3)]
+        recent = self.make_transaction(account, 'OUT', '7.00', is_deleted=True)
+        Transaction.all_objects.filter(pk__in=[tx.pk for tx in old]).update(
+            deleted_at=timezone.now() - datetime.timedelta(days=40),
+        )
+
+        out = StringIO()
+        call_command('compact_deleted_transactions', '--days', '30', '--batch-size', '2', stdout=out)
+        self.assertIn('Archived 3 transactions', out.getvalue())
+
+        self.assertEqual(set(Transaction.all_objects.values_list('id', flat=True)), {live.id, recent.id})
+        archived = ArchivedTransaction.objects.order_by('id')
+        self.assertEqual([row.id for row in archived], [tx.id for tx in old])
+        self.assertEqual(archived[0].description, 'old 0')
+        self.assertEqual(archived[0].account_id, account.id)
+        self.assertEqual(archived[0].user, self.user)
+
+        account.refresh_from_db()
+        self.assertEqual(account.current_balance, Decimal('90.00'))
+        self.assertEqual(self.client.get('/api/finance/transactions/summary/').data['total_expense'], Decimal('10.00'))
+
+
+class ForecastTests(FinanceTestCase):
+    url = '/api/finance/accounts/forecast/'
+
+    def test_projection(self):
+        today = datetime.date(2024, 1, 15)
+        account = self.make_account(balance='1000.00')
+        rent = RecurringExpense.objects.create(user=self.user, name='Renta', amount=Decimal('300.00'), due_day=31, account=account)
+        RecurringExpense.objects.filter(pk=rent.pk).update(next_due_date=datetime.date(2024, 1, 31))
+        Debt.objects.create(user=self.user, name='Tarjeta', type='I_OWE', total_amount=Decimal('500.00'),
+                            remaining_amount=Decimal('200.00'), due_date=datetime.date(2024, 2, 10))
+        Debt.objects.create(user=self.user, name='Ana', type='OWED_TO_ME', total_amount=Decimal('50.00'),
+                            remaining_amount=Decimal('50.00'), due_date=datetime.date(2024, 1, 1))
+        # 180.00 over the 10 days since the first transaction; payments and transfers are not discretionary
+        self.make_transaction(account, 'OUT', '90.00', date=datetime.date(2024, 1, 6), category=self.food)
+        self.make_transaction(account, 'OUT', '90.00', date=today, category=self.food)
+        self.make_transaction(account, 'OUT', '300.00', date=datetime.date(2024, 1, 10), description='Pago automatizado: Renta')
+        self.make_transaction(account, 'OUT', '100.00', date=today, is_transfer=True)
+        # current balance: 1000 - 180 - 300 - 100 = 420
+
+        with self.assertNumQueries(5):
+            result = forecast.build_forecast(self.user, days=60, today=today)
+
+        dates = result['dates']
+        self.assertEqual((dates[0], dates[-1], len(dates)), ('2024-01-16', '2024-03-15', 60))
+        balances = dict(zip(dates, result['accounts'][0]['balances']))
+        self.assertEqual(balances['2024-01-16'], 420 - 18)
+        self.assertEqual(balances['2024-01-30'], 420 - 18 * 15)
+        self.assertEqual(balances['2024-01-31'], 420 - 18 * 16 - 300)
+        # Due day 31 falls on the last day of February
+        self.assertEqual(balances['2024-02-28'], 420 - 18 * 44 - 300)
+        self.assertEqual(balances['2024-02-29'], 420 - 18 * 45 - 600)
+
+        unassigned = dict(zip(dates, result['unassigned']['balances']))
+        self.assertEqual((unassigned['2024-01-16'], unassigned['2024-02-09'], unassigned['2024-02-10']), (50, 50, -150))
+        self.assertEqual(result['total']['balances'][-1], balances['2024-03-15'] - 150)
+        self.assertEqual(result['total']['lowest_date'], '2024-03-15')
+        self.assertEqual(result['daily_discretionary_by_category'],
+                         [{'category__name': 'Comida', 'category__color': '#FF0000', 'daily_average': 18.0}])
+
+    def test_single_recent_expense_is_spread_over_the_window(self):
+        account = self.make_account(balance='5000.00')
+        self.make_transaction(account, 'IN', '100.00', date=self.today - datetime.timedelta(days=365))
+        self.make_transaction(account, 'OUT', '900.00', date=self.today - datetime.timedelta(days=2), category=self.food)
+        debt = Debt.objects.create(user=self.user, name='Tarjeta', type='I_OWE', total_amount=Decimal('500.00'),
+                                   remaining_amount=Decimal('500.00'), due_date=self.today + datetime.timedelta(days=20))
+        response = self.client.post(f'/api/finance/debts/{debt.id}/pay/', {'amount': '300.00', 'account_id': account.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        result = forecast.build_forecast(self.user, days=30, today=self.today)
+
+        # 900.00 over the whole 90-day window, not the 3 days since the expense; the debt payment is left out
+        self.assertEqual(result['daily_discretionary_by_category'],
+                         [{'category__name': 'Comida', 'category__color': '#FF0000', 'daily_average': 10.0}])
+        self.assertEqual(result['accounts'][0]['balances'][0], 5000 + 100 - 900 - 300 - 10)
+
+    def test_days_parameter(self):
+        self.make_account()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['dates']), forecast.DEFAULT_DAYS)
+        self.assertEqual(len(self.client.get(self.url, {'days': 365}).data['accounts'][0]['balances']), 365)
+        for days in ('0', '366', 'x'):
+            self.assertEqual(self.client.get(self.url, {'days': days}).status_code, 400)
+
+
+class AnalyticsTests(FinanceTestCase):
+    url = '/api/finance/transactions/analytics/'
+
+    def setUp(self):
+        super().setUp()
+        account = self.make_account()
+        self.make_transaction(account, 'IN', '1000.00', date=datetime.date(2024, 1, 1), category=self.salary)
+        self.make_transaction(account, 'OUT', '40.00', date=datetime.date(2024, 1, 3), category=self.food)
+        self.make_transaction(account, 'OUT', '10.00', date=datetime.date(2024, 1, 3))
+        self.make_transaction(account, 'OUT', '25.00', date=datetime.date(2024, 2, 29), category=self.food)
+        self.make_transaction(account, 'OUT', '500.00', date=datetime.date(2024, 1, 3), is_transfer=True, payment_method='TRANSFER')
+        self.make_transaction(account, 'OUT', '999.00', date=datetime.date(2024, 1, 3), is_deleted=True)
+
+    def get_series(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['series']
+
+    def test_daily_series_is_zero_filled_in_one_query(self):
+        with self.assertNumQueries(1):
+            series = analytics.time_series(self.user, datetime.date(2023, 12, 31), datetime.date(2024, 12, 30))
+        self.assertEqual(len(series), 366)
+        self.assertEqual(series[0], {'period': '2023-12-31', 'income': 0, 'expense': 0, 'net': 0})
+        self.assertEqual(series[1], {'period': '2024-01-01', 'income': Decimal('1000.00'), 'expense': 0, 'net': Decimal('1000.00')})
+        self.assertEqual(series[3]['expense'], Decimal('50.00'))
+
+    def test_granularities(self):
+        weeks = self.get_series(start='2024-01-01', end='2024-03-03', granularity='week')
+        self.assertEqual((weeks[0]['period'], weeks[-1]['period'], len(weeks)), ('2024-01-01', '2024-02-26', 9))
+        self.assertEqual(weeks[0]['net'], Decimal('950.00'))
+
+        months = self.get_series(start='2024-01-02', end='2024-03-01', granularity='month')
+        self.assertEqual([(row['period'], row['expense']) for row in months],
+                         [('2024-01-01', Decimal('50.00')), ('2024-02-01', Decimal('25.00')), ('2024-03-01', 0)])
+        # Buckets are cut at the range: the 1 January income is outside
+        self.assertEqual(months[0]['income'], 0)
+
+        years = self.get_series(start='2023-06-01', end='2024-12-31', granularity='year')
+        self.assertEqual([(row['period'], row['net']) for row in years], [('2023-01-01', 0), ('2024-01-01', Decimal('925.00'))])
+
+    def test_category_breakdown(self):
+        january = self.get_series(start='2024-01-01', end='2024-01-31', granularity='month', by_category='true')[0]
+        self.assertEqual(january['expenses_by_category'], [
+            {'category__name': 'Comida', 'category__color': '#FF0000', 'total': Decimal('40.00')},
+            {'category__name': None, 'category__color': None, 'total': Decimal('10.00')},
+        ])
+        self.assertEqual(january['incomes_by_category'][0]['category__name'], 'Sueldo')
+
+    def test_defaults_and_validation(self):
+        series = self.get_series()
+        self.assertEqual(len(series), analytics.DEFAULT_DAYS)
+        self.assertEqual(series[-1]['period'], datetime.date.today().strftime('%Y-%m-%d'))
+        for params in ({'granularity': 'hour'}, {'start': '2024-13-01'}, {'start': '2024-02-01', 'end': '2024-01-01'},
+                       {'start': '1990-01-01', 'end': '2024-01-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': '1990-01-01', 'end': '2024-01-01', 'granularity': 'month'}).status_code, 200)
+
+
+class NetWorthTests(FinanceTestCase):
+    url = '/api/finance/accounts/net-worth/'
+
+    def setUp(self):
+        super().setUp()
+        self.bank = self.make_account(balance='100.00')
+        self.cash = self.make_account(name='Efectivo')
+        self.make_transaction(self.bank, 'IN', '1000.00', date=datetime.date(2023, 6, 1))
+        self.make_transaction(self.bank, 'OUT', '200.00', date=datetime.date(2024, 1, 10))
+        self.make_transaction(self.bank, 'OUT', '50.00', date=datetime.date(2024, 1, 10), is_transfer=True, payment_method='TRANSFER')
+        self.make_transaction(self.cash, 'IN', '50.00', date=datetime.date(2024, 1, 10), is_transfer=True, payment_method='TRANSFER')
+        self.make_transaction(self.cash, 'OUT', '20.00', date=datetime.date(2024, 2, 15))
+        self.make_transaction(self.bank, 'OUT', '999.00', date=datetime.date(2024, 1, 12), is_deleted=True)
+        self.make_transaction(None, 'OUT', '75.00', date=datetime.date(2024, 1, 12))
+        SavingsGoal.objects.create(user=self.user, name='Viaje', target_amount=Decimal('1000.00'), current_amount=Decimal('300.00'))
+        Debt.objects.create(user=self.user, name='Tarjeta', type='I_OWE', total_amount=Decimal('500.00'), remaining_amount=Decimal('400.00'))
+        Debt.objects.create(user=self.user, name='Ana', type='OWED_TO_ME', total_amount=Decimal('80.00'), remaining_amount=Decimal('80.00'))
+        Debt.objects.create(user=self.user, name='Luis', type='I_OWE', total_amount=Decimal('90.00'), remaining_amount=Decimal('90.00'), is_settled=True)
+
+    def test_daily_history_in_four_queries(self):
+        with self.assertNumQueries(4):
+            history = analytics.balance_history(self.user, datetime.date(2024, 1, 9), datetime.date(2024, 2, 29))
+        bank = dict(zip(history['periods'], history['accounts'][0]['balances']))
+        cash = dict(zip(history['periods'], history['accounts'][1]['balances']))
+        self.assertEqual((bank['2024-01-09'], bank['2024-01-10'], bank['2024-02-29']), (1100, 850, 850))
+        self.assertEqual((cash['2024-01-09'], cash['2024-01-10'], cash['2024-02-14'], cash['2024-02-15']), (0, 50, 50, 30))
+        self.assertEqual(history['total'][-1], 880)
+        self.assertEqual((history['savings'], history['debts_owed'], history['debts_receivable']), (300, 400, 80))
+        self.assertEqual(history['net_worth'][0], 1100 + 300 + 80 - 400)
+        # Today's closing balances are the ledger balances
+        self.bank.refresh_from_db()
+        self.assertEqual(history['accounts'][0]['balances'][-1], self.bank.current_balance)
+
+    def test_monthly_buckets_through_the_api(self):
+        response = self.client.get(self.url, {'start': '2024-01-15', 'end': '2024-03-31', 'granularity': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['periods'], ['2024-01-01', '2024-02-01', '2024-03-01'])
+        self.assertEqual(response.data['total'], [900, 880, 880])
+        self.assertEqual(response.data['net_worth'], [880, 860, 860])
+
+    def test_history_before_any_transaction(self):
+        history = analytics.balance_history(self.user, datetime.date(2023, 1, 1), datetime.date(2023, 12, 31), 'month')
+        self.assertEqual(history['accounts'][0]['balances'][:6], [100] * 5 + [1100])
+        self.assertEqual(self.client.get(self.url, {'granularity': 'hour'}).status_code, 400)
+
+
+class BalanceSnapshotTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.account = self.make_account(balance='100.00')
+        self.idle = self.make_account(name='Efectivo')
+        self.make_transaction(self.account, 'IN', '50.00', date=datetime.date(2024, 1, 2))
+        self.make_transaction(self.account, 'OUT', '20.00', date=datetime.date(2024, 1, 4))
+
+    def ledgers(self, account):
+        return {
+            date.isoformat(): value
+            for date, value in account.balance_snapshots.order_by('date').values_list('date', 'ledger_balance')
+        }
+
+    def test_backfill_then_nightly_runs(self):
+        out = StringIO()
+        call_command('snapshot_balances', '--date', '2024-01-05', stdout=out)
+        self.assertIn('Wrote 5 balance snapshots up to 2024-01-05.', out.getvalue())
+        self.assertEqual(self.ledgers(self.account), {'2024-01-02': 50, '2024-01-03': 50, '2024-01-04': 30, '2024-01-05': 30})
+        # Accounts without transactions start on the last day
+        self.assertEqual(self.ledgers(self.idle), {'2024-01-05': 0})
+
+        self.make_transaction(self.account, 'IN', '5.00', date=datetime.date(2024, 1, 7))
+        self.assertEqual(snapshots.take_snapshots(datetime.date(2024, 1, 7)), 4)
+        self.assertEqual(self.ledgers(self.account)['2024-01-07'], 35)
+        self.assertEqual(snapshots.take_snapshots(datetime.date(2024, 1, 7)), 0)
+
+        self.assertEqual(snapshots.take_snapshots(datetime.date(2024, 1, 7), since=datetime.date(2023, 12, 31),
+                                                  accounts=Account.objects.filter(pk=self.idle.pk)), 0)
+
+    def test_back_dated_writes_invalidate_only_later_snapshots(self):
+        snapshots.take_snapshots(datetime.date(2024, 1, 10), since=datetime.date(2024, 1, 1))
+        self.assertEqual(len(self.ledgers(self.account)), 10)
+
+        late = self.make_transaction(self.account, 'OUT', '7.00', date=datetime.date(2024, 1, 3))
+        self.assertEqual(list(self.ledgers(self.account)), ['2024-01-01', '2024-01-02'])
+        self.assertEqual(len(self.ledgers(self.idle)), 10)
+
+        # Changes that leave every balance as it was keep the snapshots
+        snapshots.take_snapshots(datetime.date(2024, 1, 10))
+        late.description = 'Farmacia'
+        late.save()
+        self.assertEqual(len(self.ledgers(self.account)), 10)
+        self.assertEqual(self.ledgers(self.account)['2024-01-10'], 23)
+
+        late.date = datetime.date(2024, 1, 8)
+        late.save()
+        self.assertEqual(list(self.ledgers(self.account))[-1], '2024-01-02')
+
+        snapshots.take_snapshots(datetime.date(2024, 1, 10))
+        late.delete()
+        self.assertEqual(list(self.ledgers(self.account))[-1], '2024-01-07')
+
+        bulk_create_transactions([Transaction(user=self.user, account=self.idle, type='IN', amount=Decimal('9.00'),
+                                              date=datetime.date(2024, 1, 5), payment_method='CASH')])
+        self.assertEqual(list(self.ledgers(self.idle))[-1], '2024-01-04')
+
+        snapshots.take_snapshots(datetime.date(2024, 1, 10))
+        self.assertEqual(self.ledgers(self.account)['2024-01-10'], 30)
+        self.assertEqual(self.ledgers(self.idle)['2024-01-10'], 9)
+
+    def test_balance_as_of_reads_nearest_snapshot(self):
+        snapshots.take_snapshots(datetime.date(2024, 1, 3))
+        self.make_transaction(self.account, 'OUT', '1.00', date=datetime.date(2024, 1, 20))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(snapshots.balance_as_of(self.account, datetime.date(2024, 1, 10)), (130, datetime.date(2024, 1, 3)))
+        self.assertEqual(snapshots.balance_as_of(self.account, datetime.date(2024, 1, 1)), (100, None))
+
+        response = self.client.get(f'/api/finance/accounts/{self.account.id}/balance/', {'date': '2024-01-31'})
+        self.assertEqual(response.data, {'account': self.account.id, 'date': '2024-01-31', 'balance': Decimal('129.00'),
+                                         'snapshot_date': '2024-01-03'})
+        self.assertEqual(self.client.get(f'/api/finance/accounts/{self.account.id}/balance/', {'date': 'ayer'}).status_code, 400)
+
+    def test_reconcile_as_of_a_statement_date(self):
+        snapshots.take_snapshots(datetime.date(2024, 1, 10))
+        response = self.client.post(f'/api/finance/accounts/{self.account.id}/reconcile/',
+                                    {'actual_balance': '125.00', 'date': '2024-01-04'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['previous_balance'], response.data['type']), (130.0, 'OUT'))
+        adjustment = Transaction.objects.get(description='Ajuste de saldo')
+        self.assertEqual(adjustment.date, datetime.date(2024, 1, 4))
+        self.assertEqual(list(self.ledgers(self.account))[-1], '2024-01-03')
+        self.assertEqual(snapshots.balance_as_of(self.account, datetime.date(2024, 1, 4))[0], 125)
+
+        future = (datetime.date.today() + datetime.timedelta(days=1)).isoformat()
+        self.assertEqual(self.client.post(f'/api/finance/accounts/{self.account.id}/reconcile/',
+                                          {'actual_balance': '1', 'date': future}, format='json').status_code, 400)
@@ -1,12 +1,56 @@
 import datetime
-from rest_framework import viewsets
+import io
+from contextlib import ExitStack
+from rest_framework import serializers, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, AuthenticationFailed, ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from django.db.models import Sum, Q 
-from django.db.models import Sum, Q 
+from asgiref.sync import sync_to_async
+from django.db import transaction as db_transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.utils.http import parse_etags
 from .models import Category, Transaction, SavingsGoal, Debt, Account, RecurringExpense
 from .serializers import CategorySerializer, TransactionSerializer, SavingsGoalSerializer, DebtSerializer, AccountSerializer, RecurringExpenseSerializer
+from .summary import build_summary, abuild_summary
+from .exports import stream_export, CONTENT_TYPES
+from .importers import import_statement, detect_format
+from .bulk import DEFAULT_BATCH_SIZE
+from .readers import transaction_rows, serialize_row, serialize_rows
+from .filters import TransactionFilterBackend, TransactionSearchFilter
+from .pagination import TransactionKeysetPagination
+from . import analytics
+from .forecast import build_forecast, DEFAULT_DAYS as FORECAST_DEFAULT_DAYS, MAX_DAYS as FORECAST_MAX_DAYS
+from .recurring import PAYMENT_DESCRIPTION_PREFIX
+from .snapshots import balance_as_of
+from .caching import get_data_version, aget_data_version, summary_cache_key, summary_etag, get_or_build, aget_or_build
+from config.metrics import CACHE_REQUESTS
+from config.routers import read_from_replica
+from users.authentication import CachedJWTAuthentication
+
+MAX_IMPORT_BATCH_SIZE = 5000
+
+
+class ReplicaReadMixin:
+    """
+    Runs the `replica_actions` of a viewset inside read_from_replica, so their
+    queries go to the read replica unless the user has just written.
+    """
+    replica_actions = ()
+    read_alias = None
+
+    def dispatch(self, request, *args, **kwargs):
+        # Closed however the request ends, unhandled exceptions included
+        with ExitStack() as self._replica_reads:
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions:
+            self.read_alias = self._replica_reads.enter_context(read_from_replica(request.user.id))
+
 
 class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
@@ -18,17 +62,34 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionKeysetPagination
+    filter_backends = [TransactionFilterBackend, TransactionSearchFilter]
+    replica_actions = ('list', 'summary', 'analytics', 'export')
 
     def get_queryset(self):
-        queryset = Transaction.objects.filter(user=self.request.user, is_deleted=False)
-        month = self.request.query_params.get('month', None)
-        year = self.request.query_params.get('year', None)
-        if month and year:
-            queryset = queryset.filter(date__year=year, date__month=month)
-        return queryset.order_by('-date', '-created_at')
+        # month/year and the other list filters live in TransactionFilterBackend
+        queryset = Transaction.objects.filter(user=self.request.user)
+        return queryset.order_by('-date', '-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        # Read path: joined values() rows rendered directly, same output as TransactionSerializer
+        rows = transaction_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_rows(page))
+        return Response(serialize_rows(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            row = transaction_rows(self.get_queryset()).filter(pk=kwargs['pk']).first()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise NotFound()
+        return Response(serialize_row(row))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -39,82 +100,34 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        queryset = self.get_queryset()
-        
-        # Omit transfers from net income/expense calculations
-        incomes = queryset.filter(type='IN', is_transfer=False).aggregate(Sum('amount'))['amount__sum'] or 0
-        expenses = queryset.filter(type='OUT', is_transfer=False).aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        expenses_by_category = queryset.filter(type='OUT', is_transfer=False).values('category__name', 'category__color').annotate(total=Sum('amount')).order_by('-total')
-        incomes_by_category = queryset.filter(type='IN', is_transfer=False).values('category__name', 'category__color').annotate(total=Sum('amount')).order_by('-total')
-        
-        # Calculate exactly how much money we have physically or in the bank by matching Accounts against Transactions
-        accounts = Account.objects.filter(user=self.request.user)
-        accounts_data = []
-        for account in accounts:
-            # We must sum all incomes towards this account and subtract all expenses from it
-            # Initial balance + (Incomes) - (Expenses)
-            # IMPORTANT: For account balances, we MUST include transfers, so we query the DB directly, not the filtered queryset!
-            # AND we MUST NOT filter by date, because an account balance is the sum of ALL history.
-            account_txs = Transaction.objects.filter(user=self.request.user, is_deleted=False, account=account)
-            
-            acc_incomes = account_txs.filter(type='IN').aggregate(Sum('amount'))['amount__sum'] or 0
-            acc_expenses = account_txs.filter(type='OUT').aggregate(Sum('amount'))['amount__sum'] or 0
-            
-            calculated_balance = account.balance + acc_incomes - acc_expenses
-            accounts_data.append({
-                'id': account.id,
-                'name': account.name,
-                'type': account.type,
-                'color': account.color,
-                'calculated_balance': calculated_balance
-            })
-            
-        # Calculate upcoming fixed expenses for the current month
+        month = self.request.query_params.get('month', None)
+        year = self.request.query_params.get('year', None)
+        user = self.request.user
         today = datetime.date.today()
-        recurring_expenses = RecurringExpense.objects.filter(user=self.request.user, is_active=True)
-        upcoming_fixed_expenses = 0
-        for expense in recurring_expenses:
-            # Check if it was already paid this month
-            if expense.last_paid_date and expense.last_paid_date.year == today.year and expense.last_paid_date.month == today.month:
-                continue # Already paid
-            
-            # If not paid, consider it upcoming or past due
-            upcoming_fixed_expenses += expense.amount
-            
-        # Last 7 days expenses
-        last_7_days_expenses = []
-        for i in range(6, -1, -1):
-            day = today - datetime.timedelta(days=i)
-            
-            day_txs = Transaction.objects.filter(
-                user=self.request.user, 
-                is_deleted=False, 
-                type='OUT', 
-                is_transfer=False,
-                date=day
-            )
-            
-            day_total = day_txs.aggregate(Sum('amount'))['amount__sum'] or 0
-            
-            # Fetch breakdown by category
-            day_categories = day_txs.values('category__name', 'category__color').annotate(total=Sum('amount')).order_by('-total')
-            
-            last_7_days_expenses.append({
-                'date': day.strftime('%Y-%m-%d'),
-                'total': day_total,
-                'categories': list(day_categories)
-            })
-            
+
+        # Cached per data version: any write by the user moves to a new key and ETag
+        cache_key = summary_cache_key(user.id, get_data_version(user.id), month, year, today)
+        etag = summary_etag(cache_key)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            CACHE_REQUESTS.labels('summary', 'not_modified').inc()
+            return Response(status=304, headers={'ETag': etag})
+
+        data = get_or_build(cache_key, lambda: build_summary(user, month=month, year=year, today=today), read_alias=self.read_alias)
+        return Response(data, headers={'ETag': etag})
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        try:
+            start, end, granularity = analytics.parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        by_category = request.query_params.get('by_category', '').lower() in ('true', '1')
         return Response({
-            'balance': incomes - expenses,
-            'total_income': incomes,
-            'total_expense': expenses,
-            'expenses_by_category': list(expenses_by_category),
-            'incomes_by_category': list(incomes_by_category),
-            'accounts': accounts_data,
-            'upcoming_fixed_expenses': upcoming_fixed_expenses,
-            'last_7_days_expenses': last_7_days_expenses
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'granularity': granularity,
+            'series': analytics.time_series(request.user, start, end, granularity, by_category=by_category),
         })
 
     @action(detail=False, methods=['post'])
@@ -154,30 +167,69 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if description:
             desc_to += f" ({description})"
 
-        Transaction.objects.create(
-            user=user,
-            type='OUT',
-            amount=amount,
-            date=date,
-            account=from_acc,
-            description=desc_from,
-            payment_method='TRANSFER',
-            is_transfer=True
-        )
+        with db_transaction.atomic():
+            Transaction.objects.create(
+                user=user,
+                type='OUT',
+                amount=amount,
+                date=date,
+                account=from_acc,
+                description=desc_from,
+                payment_method='TRANSFER',
+                is_transfer=True
+            )
 
-        Transaction.objects.create(
-            user=user,
-            type='IN',
-            amount=amount,
-            date=date,
-            account=to_acc,
-            description=desc_to,
-            payment_method='TRANSFER',
-            is_transfer=True
-        )
+            Transaction.objects.create(
+                user=user,
+                type='IN',
+                amount=amount,
+                date=date,
+                account=to_acc,
+                description=desc_to,
+                payment_method='TRANSFER',
+                is_transfer=True
+            )
 
         return Response({'message': 'Transfer successful'})
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in CONTENT_TYPES:
+            return Response({'error': 'output must be csv or ndjson'}, status=400)
+
+        # Bound to the alias now: the rows are read while streaming, after the view returns
+        queryset = self.filter_queryset(self.get_queryset()).using(self.read_alias)
+        response = StreamingHttpResponse(stream_export(queryset, output), content_type=CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="transactions.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_statement(self, request):
+        upload = request.FILES.get('file')
+        account_id = request.data.get('account')
+
+        if not upload or not account_id:
+            return Response({'error': 'file and account are required'}, status=400)
+
+        account = Account.objects.filter(id=account_id, user=request.user).first()
+        if not account:
+            return Response({'error': 'Account not found'}, status=404)
+
+        try:
+            batch_size = int(request.data.get('batch_size') or DEFAULT_BATCH_SIZE)
+        except ValueError:
+            return Response({'error': 'Invalid batch_size'}, status=400)
+
+        statement_format = request.data.get('format') or detect_format(upload.name)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+        try:
+            result = import_statement(request.user, account, stream, statement_format, max(1, min(batch_size, MAX_IMPORT_BATCH_SIZE)))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        return Response(result)
+
 class SavingsGoalViewSet(viewsets.ModelViewSet):
     serializer_class = SavingsGoalSerializer
     permission_classes = [IsAuthenticated]
@@ -307,7 +359,7 @@ class DebtViewSet(viewsets.ModelViewSet):
         # If I owe money and I pay it, it's an expense (OUT) from my account
         # If someone owes me money and pays me, it's an income (IN) to my account
         tx_type = 'OUT' if debt.type == 'I_OWE' else 'IN'
-        desc = f"Payment for debt/loan: {debt.name}"
+        desc = f"{Debt.PAYMENT_DESCRIPTION_PREFIX}{debt.name}"
         
         Transaction.objects.create(
             user=request.user,
@@ -326,9 +378,10 @@ class DebtViewSet(viewsets.ModelViewSet):
         
         return Response(DebtSerializer(debt).data)
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
+    replica_actions = ('forecast', 'net_worth', 'balance')
 
     def get_queryset(self):
         return Account.objects.filter(user=self.request.user).order_by('name')
@@ -336,11 +389,51 @@ class AccountViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def forecast(self, request):
+        try:
+            days = int(request.query_params.get('days', FORECAST_DEFAULT_DAYS))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=400)
+        if not 1 <= days <= FORECAST_MAX_DAYS:
+            return Response({'error': f'days must be between 1 and {FORECAST_MAX_DAYS}'}, status=400)
+        return Response(build_forecast(request.user, days=days))
+
+    @action(detail=False, methods=['get'], url_path='net-worth')
+    def net_worth(self, request):
+        try:
+            start, end, granularity = analytics.parse_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'granularity': granularity,
+            **analytics.balance_history(request.user, start, end, granularity),
+        })
+
+    @action(detail=True, methods=['get'])
+    def balance(self, request, pk=None):
+        account = self.get_object()
+        try:
+            date = datetime.date.fromisoformat(request.query_params.get('date') or datetime.date.today().isoformat())
+        except ValueError:
+            return Response({'error': 'date must be a date (YYYY-MM-DD)'}, status=400)
+
+        balance, snapshot_date = balance_as_of(account, date)
+        return Response({
+            'account': account.id,
+            'date': date.strftime('%Y-%m-%d'),
+            'balance': balance,
+            'snapshot_date': snapshot_date.strftime('%Y-%m-%d') if snapshot_date else None,
+        })
+
     @action(detail=True, methods=['post'])
     def reconcile(self, request, pk=None):
         account = self.get_object()
         actual_balance = request.data.get('actual_balance')
         notes = request.data.get('notes', '')
+        date = request.data.get('date')
 
         if actual_balance is None:
             return Response({'error': 'actual_balance is required'}, status=400)
@@ -350,12 +443,19 @@ class AccountViewSet(viewsets.ModelViewSet):
         except ValueError:
             return Response({'error': 'Invalid actual_balance'}, status=400)
 
-        # Calculate current balance (same logic as summary)
-        account_txs = Transaction.objects.filter(user=self.request.user, is_deleted=False, account=account)
-        acc_incomes = account_txs.filter(type='IN').aggregate(Sum('amount'))['amount__sum'] or 0
-        acc_expenses = account_txs.filter(type='OUT').aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        current_calculated_balance = float(account.balance) + float(acc_incomes) - float(acc_expenses)
+        if date:
+            # Reconciling against a statement: the balance at the end of that day
+            try:
+                date = datetime.date.fromisoformat(date)
+            except ValueError:
+                return Response({'error': 'date must be a date (YYYY-MM-DD)'}, status=400)
+            if date > datetime.date.today():
+                return Response({'error': 'date cannot be in the future'}, status=400)
+            current_calculated_balance = float(balance_as_of(account, date)[0])
+        else:
+            # Current balance from the running ledger (same logic as summary)
+            date = datetime.date.today()
+            current_calculated_balance = float(account.current_balance)
         diff = actual_balance - current_calculated_balance
 
         if diff == 0:
@@ -373,7 +473,7 @@ class AccountViewSet(viewsets.ModelViewSet):
             account=account,
             type=tx_type,
             amount=abs_diff,
-            date=datetime.date.today(),
+            date=date,
             description=description,
             payment_method='TRANSFER', # Using TRANSFER as it's an internal adjustment
             is_transfer=True # Mark as transfer to avoid inflating gross income/expenses
@@ -401,21 +501,65 @@ class RecurringExpenseViewSet(viewsets.ModelViewSet):
     def pay(self, request, pk=None):
         expense = self.get_object()
         account_id = request.data.get('account_id') or (expense.account.id if expense.account else None)
+        paid_on = request.data.get('date') or datetime.date.today()
+        if isinstance(paid_on, str):
+            paid_on = serializers.DateField().to_internal_value(paid_on)
         
-        # Create the transaction
-        Transaction.objects.create(
-            user=self.request.user,
-            type='OUT',
-            account_id=account_id,
-            category_id=expense.category.id if expense.category else None,
-            amount=expense.amount,
-            date=request.data.get('date') or datetime.date.today(),
-            description=f'Pago automatizado: {expense.name}',
-            payment_method='TRANSFER', # Default assume electronic
-        )
-        
-        # Update the expense
-        expense.last_paid_date = request.data.get('date') or datetime.date.today()
-        expense.save()
+        with db_transaction.atomic():
+            # Create the transaction
+            Transaction.objects.create(
+                user=self.request.user,
+                type='OUT',
+                account_id=account_id,
+                category_id=expense.category.id if expense.category else None,
+                amount=expense.amount,
+                date=paid_on,
+                description=f'{PAYMENT_DESCRIPTION_PREFIX}{expense.name}',
+                payment_method='TRANSFER', # Default assume electronic
+            )
+            
+            # Update the expense; saving advances next_due_date past the paid month
+            expense.last_paid_date = paid_on
+            expense.save()
         
         return Response(RecurringExpenseSerializer(expense).data)
+
+
+@require_GET
+async def summary_async(request):
+    """
+    Async variant of TransactionViewSet.summary with the same payload, cache
+    and ETag; its aggregates run concurrently. Meant for the ASGI serving
+    mode (SERVER_MODE=asgi), where it does not hold a worker while waiting.
+    """
+    try:
+        authenticated = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return _unauthorized(e.detail)
+    if authenticated is None:
+        return _unauthorized('Authentication credentials were not provided.')
+    user = request.user = authenticated[0]
+
+    month = request.GET.get('month', None)
+    year = request.GET.get('year', None)
+    today = datetime.date.today()
+
+    cache_key = summary_cache_key(user.id, await aget_data_version(user.id), month, year, today)
+    etag = summary_etag(cache_key)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        CACHE_REQUESTS.labels('summary', 'not_modified').inc()
+        return HttpResponse(status=304, headers={'ETag': etag})
+
+    try:
+        with read_from_replica(user.id) as alias:
+            data = await aget_or_build(
+                cache_key, lambda: abuild_summary(user, month=month, year=year, today=today), read_alias=alias,
+            )
+    except ValidationError as e:
+        return HttpResponse(JSONRenderer().render(e.detail), status=400, content_type='application/json')
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', headers={'ETag': etag})
+
+
+def _unauthorized(detail):
+    body = JSONRenderer().render({'detail': detail})
+    return HttpResponse(body, status=401, content_type='application/json', headers={'WWW-Authenticate': 'Bearer realm="api"'})
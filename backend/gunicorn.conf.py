@@ -0,0 +1,25 @@
+# Loaded automatically by `gunicorn` from the working directory
+import os
+import shutil
+
+# SERVER_MODE=asgi serves config.asgi through uvicorn workers, so async views
+# (e.g. the async summary) can overlap requests within a worker
+if os.environ.get('SERVER_MODE') == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be summed into the new one
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
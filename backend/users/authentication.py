@@ -0,0 +1,75 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+AUTH_VERSION_KEY = 'users:auth-version:{user_id}'
+USER_KEY = 'users:jwt-user:{user_id}:{version}'
+# Never written to the shared cache; a cached user loads them on first access
+SECRET_FIELDS = ('password', 'whatsapp_apikey')
+
+
+def get_auth_version(user_id):
+    version = cache.get(AUTH_VERSION_KEY.format(user_id=user_id))
+    if version is None:
+        # Evicted or never written: a fresh version, so no older entry can match
+        version = invalidate_cached_user(user_id)
+    return version
+
+
+def invalidate_cached_user(user_id):
+    # Same scheme as finance.caching: a timestamp version, bumped after every commit
+    # that changes the user, so a lookup racing the write caches under the old key
+    version = time.time_ns()
+    cache.set(AUTH_VERSION_KEY.format(user_id=user_id), version, None)
+    return version
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from the cache instead
+    of a SELECT on every request. Entries expire after JWT_USER_CACHE_TIMEOUT
+    seconds and are dropped whenever the user is saved or deleted (profile
+    edits, password changes, deactivation); QuerySet.update() bypasses that.
+
+    Only the non-secret fields are cached, plus the password-hash digest
+    the revocation check compares with the token: the user is rebuilt with
+    SECRET_FIELDS deferred.
+    """
+
+    def cached_fields(self):
+        return [field.attname for field in self.user_model._meta.concrete_fields if field.name not in SECRET_FIELDS]
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        key = USER_KEY.format(user_id=user_id, version=get_auth_version(user_id))
+        fields = self.cached_fields()
+        entry = cache.get(key)
+        if entry is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            password_hash = get_md5_hash_password(user.password)
+            entry = {'values': [getattr(user, name) for name in fields], 'password_hash': password_hash}
+            cache.set(key, entry, getattr(settings, 'JWT_USER_CACHE_TIMEOUT', 300))
+        else:
+            user = self.user_model.from_db(self.user_model.objects.db, fields, entry['values'])
+            password_hash = entry['password_hash']
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_hash:
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,13 @@
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import invalidate_cached_user
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # After commit, so a concurrent request can never cache the pre-write row under the new version
+    transaction.on_commit(partial(invalidate_cached_user, instance.pk))
@@ -1,3 +1,73 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import CachedJWTAuthentication, USER_KEY, get_auth_version
 
-# Create your tests here.
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CachedJWTAuthenticationTests(TestCase):
+    url = '/api/users/profile/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='secret-pass-123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get_profile(self, queries):
+        with self.assertNumQueries(queries):
+            return self.client.get(self.url)
+
+    def test_user_lookup_is_cached(self):
+        authentication, token = CachedJWTAuthentication(), AccessToken.for_user(self.user)
+        with self.assertNumQueries(1):
+            authentication.get_user(token)
+        with self.assertNumQueries(0):
+            user = authentication.get_user(token)
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'ana', True))
+
+    def test_secrets_stay_out_of_the_cache(self):
+        User.objects.filter(pk=self.user.pk).update(whatsapp_apikey='wa-secret-key')
+        self.assertEqual(self.get_profile(1).status_code, 200)
+
+        entry = repr(cache.get(USER_KEY.format(user_id=self.user.pk, version=get_auth_version(self.user.pk))))
+        self.assertIn('ana', entry)
+        self.assertNotIn(self.user.password, entry)
+        self.assertNotIn('wa-secret-key', entry)
+        # A cached user still reads them, as one query for the deferred field
+        self.assertEqual(self.get_profile(1).data['whatsapp_apikey'], 'wa-secret-key')
+
+    def test_profile_update_invalidates(self):
+        self.get_profile(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(self.url, {'whatsapp_phone': '+5215512345678'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get_profile(1).data['whatsapp_phone'], '+5215512345678')
+
+    def test_password_change_invalidates(self):
+        self.get_profile(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('another-pass-456')
+            self.user.save()
+
+        self.get_profile(1)
+
+    def test_deactivated_user_is_rejected(self):
+        self.get_profile(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.get_profile(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertEqual(self.client.get(self.url).status_code, 401)
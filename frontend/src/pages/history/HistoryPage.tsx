@@ -1,5 +1,5 @@
 import { useState } from 'react';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { financeService } from '../../services/finance';
 import { History, TrendingDown, TrendingUp, Search, Calendar, Trash2 } from 'lucide-react';
 import { format } from 'date-fns';
@@ -11,10 +11,14 @@ export function HistoryPage() {
 
     const queryClient = useQueryClient();
 
-    const { data: transactions = [], isLoading } = useQuery({
+    const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery({
         queryKey: ['transactions', 'history'],
-        queryFn: () => financeService.getTransactions()
+        queryFn: ({ pageParam }) => financeService.getTransactions(pageParam ? { cursor: pageParam } : undefined),
+        initialPageParam: null as string | null,
+        // Each page links to the next one through its keyset cursor
+        getNextPageParam: (lastPage) => lastPage.next ? new URL(lastPage.next).searchParams.get('cursor') : undefined
     });
+    const transactions = data?.pages.flatMap(page => page.results) ?? [];
 
     const deleteMutation = useMutation({
         mutationFn: financeService.deleteTransaction,
@@ -145,6 +149,18 @@ export function HistoryPage() {
                     </div>
                 </div>
             )}
+
+            {hasNextPage && (
+                <div className="flex justify-center mt-6">
+                    <button
+                        onClick={() => fetchNextPage()}
+                        disabled={isFetchingNextPage}
+                        className="px-5 py-2.5 rounded-xl border border-brand-200 bg-[var(--bg-secondary)] hover:bg-[var(--bg-hover)] text-brand-700 text-sm font-medium transition-colors disabled:opacity-50"
+                    >
+                        {isFetchingNextPage ? 'Cargando...' : 'Cargar más movimientos'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
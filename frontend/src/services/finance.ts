@@ -20,6 +20,11 @@ export interface Transaction {
     description?: string;
 }
 
+export interface TransactionPage {
+    next: string | null;
+    results: Transaction[];
+}
+
 export interface SavingsGoal {
     id: number;
     name: string;
@@ -85,7 +90,8 @@ export const financeService = {
     // Transacciones
     getTransactions: async (params?: any) => {
         const { data } = await api.get('finance/transactions/', { params });
-        return data as Transaction[];
+        // Searches come back as a plain list, everything else one page at a time
+        return (Array.isArray(data) ? { next: null, results: data } : data) as TransactionPage;
     },
     createTransaction: async (transaction: Partial<Transaction>) => {
         const { data } = await api.post('finance/transactions/', transaction);